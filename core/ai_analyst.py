@@ -1,10 +1,18 @@
 import os
 import json
+import hashlib
 import logging
-from typing import Any, Optional
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from dotenv import load_dotenv
+from .app_config import load_app_config
+from .llm_quota import get_quota_limiter
 from .scoring_config import SCORING_CONFIG
+from .vehicle_identity import normalize_label
 
 logger = logging.getLogger(__name__)
 
@@ -24,13 +32,76 @@ class AIResponseError(RuntimeError):
     """Erreur de réponse IA (JSON invalide / structure inattendue)."""
 
 
+# Erreurs transitoires : quota (429) et 5xx => retry avec backoff exponentiel
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServerError,
+    google_exceptions.DeadlineExceeded,
+)
+
+
+# Consignes communes (grilles de sévérité), envoyées une seule fois par requête
+PROMPT_MISSION = """--- TA MISSION ---
+- IMPORTANT : Les champs "severity" doivent être compris entre 0.0 et 1.0, et refléter la gravité réelle.
+
+- IMPORTANT: Pour "risques_meca[].severity" (0.0 à 1.0), utilise cette grille:
+  * 0.05-0.15: mineur / entretien courant (petite fuite, pneus à prévoir, consommable)
+  * 0.20-0.40: défaut notable mais généralement gérable (freins, suspension fatiguée, capteur, petite fuite)
+  * 0.50-0.70: risque important / réparation coûteuse possible (embrayage, distribution incertaine, turbo, injecteurs)
+  * 0.80-1.00: critique / danger sécurité ou panne probable (moteur HS, boîte HS, surchauffe, défaut freinage majeur)
+
+- IMPORTANT: Pour "modifications[].severity" (0.0 à 1.0), utilise cette grille:
+  * 0.05-0.15: esthétique/réversible (jantes, sono, teinte ...)
+  * 0.20-0.40: modif légère (admission/échappement discret, ressorts ...)
+  * 0.50-0.70: performance (stage 1, downpipe, reprog, filtre sport ...)
+  * 0.80-1.00: modif lourde / risque légal/fiabilité (stage 2+, swap, suppression systèmes ...)
+
+- IMPORTANT: Pour "indices_arnaque[].severity" (0.0 à 1.0), utilise cette grille:
+  * 0.05-0.15: petit doute / incohérence légère (description très vague, manque d’infos, prix un peu bas sans preuve)
+  * 0.20-0.40: suspect (prix anormalement bas, vendeur évasif, incohérences, urgence/bizarreries)
+  * 0.50-0.70: très suspect (paiement inhabituel, demande d’acompte, histoire incohérente, documents flous)
+  * 0.80-1.00: quasi certain / pattern classique d’arnaque (mandat cash, escrow louche, hors plateforme, “je suis à l’étranger”, usurpation)
+
+"""
+
+# Structure attendue pour "ai_analysis"
+ANALYSIS_SCHEMA = """{
+    "summary": "Résumé expert en 1 phrase",
+    "frais_chiffrables": [{ "item": "ex: Pneus", "cout": 200, "raison": "Usure signalée" }],
+    "risques_meca": [{ "nom": "ex: Bruit moteur", "severity": 0.0 }],
+    "modifications": [{ "nom": "ex: Stage 1", "severity": 0.0 }],
+    "indices_arnaque": [{ "nom": "ex: Mandat Cash", "severity": 0.0 }],
+    "confiance": {
+      "points_positifs": ["liste EXACTE parmi: premiere_main, carnet_entretien, factures, suivi_garage, vendeur_pro, garantie, ct_ok"],
+      "points_negatifs": ["liste EXACTE parmi: orthographe_deplorable, ton_agressif, description_vague, cause_depart_suspecte"]
+    },
+    "produit_evaluation": {
+      "finition_detectee": "Nom de la finition réelle (ex: S-Line) ou 'Standard'",
+      "note_equipement_sur_10": 5,
+      "options_majeures": ["Liste 3-4 options clés"]
+    }
+  }"""
+
+
+# Cache d'analyses adressé par le contenu : à incrémenter si le prompt change
+PROMPT_VERSION = 1
+CACHE_PRICE_BAND = 500     # €
+CACHE_MILEAGE_BAND = 5000  # km
+
+
 class AIAnalyst:
     def __init__(
         self,
         model_name: str = "gemini-2.0-flash",
         generation_config: Optional[dict[str, Any]] = None,
         env_file: bool = True,
+        analysis_cache=None,
     ):
+        """
+        analysis_cache : objet exposant fetch_cached_analyses / store_cached_analyses
+        (DatabaseClient) ; None => pas de cache, chaque annonce part au modèle.
+        """
         # Chargement .env optionnel (pratique en dev, neutre en prod si env vars déjà set)
         if env_file:
             load_dotenv()
@@ -52,19 +123,239 @@ class AIAnalyst:
                 "Utilise les données déclarées (champs JSON) ET le texte pour te faire un avis."
             ),
         )
+        self.model_name = model_name
+        self.cache = analysis_cache
+        self.cfg = load_app_config().gemini
+        self.quota = get_quota_limiter()
+
+    @staticmethod
+    def _description(ad_data: dict) -> str:
+        if ad_data.get("description"):
+            return ad_data["description"]
+        raw = ad_data.get("raw_attributes")
+        if isinstance(raw, dict) and raw.get("description_text"):
+            return raw["description_text"]
+        return "Pas de description"
+
+    def content_hash(self, ad_data: dict) -> Optional[str]:
+        """
+        Empreinte des entrées du prompt, normalisées (casse, accents, ponctuation,
+        prix / km par tranches) : identique pour une annonce republiée.
+        None sans description (trop peu discriminant pour être réutilisé).
+        """
+        description = normalize_label(ad_data.get("description"))
+        if not description:
+            return None
+
+        def band(value, width):
+            try:
+                return int(value) // width
+            except (TypeError, ValueError):
+                return None
+
+        payload = {
+            "v": PROMPT_VERSION,
+            "model": self.model_name,
+            "title": normalize_label(ad_data.get("title")),
+            "description": description,
+            "price_band": band(ad_data.get("price"), CACHE_PRICE_BAND),
+            "km_band": band(ad_data.get("km"), CACHE_MILEAGE_BAND),
+            "year": ad_data.get("year"),
+            "finition": normalize_label(ad_data.get("finition")),
+            "gearbox": normalize_label(ad_data.get("gearbox")),
+        }
+        return hashlib.sha256(
+            json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def analyze_ads(self, ads: List[dict]) -> Dict[str, Optional[dict]]:
+        """
+        Analyse d'un lot d'annonces. Retourne {ad_id: {ai_analysis, scores} | None}.
+        1) cache par contenu (1 requête) : hit => seul _calculate_score est rejoué
+           avec les chiffres de la nouvelle annonce ;
+        2) reste : prompts multi-annonces (cfg.batch_size, budget de tokens) envoyés
+           en parallèle (cfg.concurrency threads), un seul passage par contenu
+           distinct ; le débit réel est borné par le limiteur RPM/TPM.
+        """
+        if not ads:
+            return {}
+
+        hashes = {ad.get("id"): self.content_hash(ad) for ad in ads}
+        cached: Dict[str, dict] = {}
+        if self.cache is not None:
+            cached = self.cache.fetch_cached_analyses(
+                [h for h in hashes.values() if h])
+
+        results: Dict[str, Optional[dict]] = {}
+        to_analyse: Dict[str, dict] = {}  # clé = hash (ou id si non cachable)
+        for ad in ads:
+            content_hash = hashes[ad.get("id")]
+            if content_hash in cached:
+                results[ad.get("id")] = self._calculate_score(
+                    {"ai_analysis": cached[content_hash]}, ad)
+            else:
+                to_analyse.setdefault(content_hash or f"id:{ad.get('id')}", ad)
+
+        if cached:
+            logger.info("♻️ Cache IA : %s/%s annonces réutilisées (republications).",
+                        len(results), len(ads))
+
+        analysed: Dict[str, Optional[dict]] = {}
+        if to_analyse:
+            batches = self._pack_batches(to_analyse)
+            workers = max(1, min(self.cfg.concurrency, len(batches)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gemini") as pool:
+                for batch_result in pool.map(self._analyze_batch, batches):
+                    analysed.update(batch_result)
+
+        new_entries = []
+        for ad in ads:
+            ad_id = ad.get("id")
+            if ad_id in results:
+                continue
+            content_hash = hashes[ad_id]
+            key = content_hash or f"id:{ad_id}"
+            result = analysed.get(key)
+            if result is not None and to_analyse[key] is not ad:
+                # même contenu dans le lot : analyse partagée, score recalculé
+                result = self._calculate_score(result, ad)
+            elif result is not None and content_hash:
+                new_entries.append({"content_hash": content_hash,
+                                    "ai_analysis": result["ai_analysis"],
+                                    "source_ad_id": ad_id})
+            results[ad_id] = result
+
+        if self.cache is not None and new_entries:
+            self.cache.store_cached_analyses(new_entries)
+        return results
 
     def analyze_ad(self, ad_data: dict) -> Optional[dict]:
         """
         Retourne un dict {ai_analysis, scores} ou None si erreur non récupérable.
         """
-        description = ad_data.get("description") or ad_data.get("raw_attributes", {}).get(
-            "description_text", "Pas de description"
+        return self.analyze_ads([ad_data]).get(ad_data.get("id"))
+
+    def _pack_batches(self, to_analyse: Dict[str, dict]) -> List[List[tuple]]:
+        """
+        Regroupe les annonces [(clé, ad), ...] par lots : au plus cfg.batch_size annonces,
+        blocs annonces <= cfg.batch_max_input_tokens, sorties attendues <= max_output_tokens.
+        """
+        max_output = int(DEFAULT_GENERATION_CONFIG["max_output_tokens"])
+        per_output = max(1, self.cfg.expected_output_tokens)
+        max_items = max(1, min(self.cfg.batch_size, max_output // per_output))
+
+        batches: List[List[tuple]] = []
+        current: List[tuple] = []
+        current_tokens = 0
+        for key, ad in to_analyse.items():
+            tokens = len(self._ad_block(ad)) // 4
+            if current and (len(current) >= max_items
+                            or current_tokens + tokens > self.cfg.batch_max_input_tokens):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append((key, ad))
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _analyze_batch(self, batch: List[tuple]) -> Dict[str, Optional[dict]]:
+        """
+        Un seul appel Gemini pour N annonces (consignes communes énoncées une fois),
+        réponse = tableau JSON indexé par id, chaque élément validé séparément.
+        Elément absent / invalide (ou réponse illisible) => repli sur un appel mono-annonce ;
+        échec de l'appel lui-même (retries épuisés) => lot entier à None, sans autre appel.
+        """
+        if len(batch) == 1:
+            key, ad = batch[0]
+            return {key: self._analyze_with_model(ad)}
+
+        ads_by_id = {str(ad.get("id")): (key, ad) for key, ad in batch}
+        prompt = (
+            f"\nANALYSE CES {len(batch)} ANNONCES (indépendamment les unes des autres) :\n\n"
+            + "".join(f"=== ANNONCE id={ad_id} ===\n{self._ad_block(ad)}"
+                      for ad_id, (_, ad) in ads_by_id.items())
+            + PROMPT_MISSION
+            + "RÉPONDS UNIQUEMENT EN JSON STRICT : un tableau, UN élément par annonce, "
+            + "avec l'id EXACT de l'annonce :\n[\n  {\"id\": \"<id>\", \"ai_analysis\": "
+            + ANALYSIS_SCHEMA
+            + "}\n]\n"
         )
 
-        prompt = f"""
-ANALYSE CETTE ANNONCE :
+        try:
+            response = self._generate(prompt, expected_outputs=len(batch))
+        except Exception as e:
+            # Quota / 5xx épuisés (ou erreur API) : pas de repli unitaire, qui multiplierait
+            # les appels sur un quota déjà saturé ; le lot sera réanalysé au prochain passage
+            logger.warning(
+                "Analyse IA par lot en échec (%s annonces), reportée: %s", len(batch), e)
+            return {key: None for key, _ in batch}
 
---- INFOS GÉNÉRALES ---
+        results: Dict[str, Optional[dict]] = {}
+        try:
+            raw = getattr(response, "text", None)
+            if not raw:
+                raise AIResponseError(
+                    "Réponse IA vide (response.text manquant).")
+            items = self._safe_json_loads(raw)
+            if not isinstance(items, list):
+                raise AIResponseError("Schéma invalide: tableau attendu.")
+
+            for item in items:
+                if not isinstance(item, dict) or str(item.get("id")) not in ads_by_id:
+                    continue
+                key, ad = ads_by_id[str(item.get("id"))]
+                try:
+                    self._validate_minimal_schema(item)
+                    results[key] = self._calculate_score(item, ad)
+                except Exception as e:
+                    logger.warning(
+                        "Elément de lot invalide (ad_id=%s): %s", ad.get("id"), e)
+        except Exception as e:
+            logger.warning(
+                "Réponse IA par lot illisible (%s annonces), repli unitaire: %s", len(batch), e)
+
+        missing = [(key, ad) for key, ad in batch if results.get(key) is None]
+        if missing:
+            logger.info(
+                "Lot IA : %s/%s annonces reprises en appel unitaire.", len(missing), len(batch))
+        for key, ad in missing:
+            results[key] = self._analyze_with_model(ad)
+        return results
+
+    def _generate(self, prompt: str, expected_outputs: int = 1) -> Any:
+        """
+        generate_content sous quota RPM/TPM, avec retries (backoff exponentiel + jitter)
+        sur quota / 5xx. Les autres erreurs remontent immédiatement.
+        """
+        estimated_tokens = len(prompt) // 4 + \
+            self.cfg.expected_output_tokens * expected_outputs
+        attempt = 0
+        while True:
+            reservation = self.quota.acquire(estimated_tokens)
+            try:
+                response = self.model.generate_content(prompt)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.cfg.max_retries:
+                    raise
+                delay = min(self.cfg.backoff_max_seconds,
+                            self.cfg.backoff_base_seconds * (2 ** attempt))
+                delay *= random.uniform(0.5, 1.0)
+                attempt += 1
+                logger.warning(
+                    "⏳ Gemini %s (tentative %s/%s) : retry dans %.1fs",
+                    type(e).__name__, attempt, self.cfg.max_retries, delay)
+                time.sleep(delay)
+                continue
+
+            usage = getattr(response, "usage_metadata", None)
+            self.quota.settle(reservation, getattr(usage, "total_token_count", None))
+            return response
+
+    @classmethod
+    def _ad_block(cls, ad_data: dict) -> str:
+        """Données d'une annonce dans le prompt (infos, vendeur, description)."""
+        description = cls._description(ad_data)
+        return f"""--- INFOS GÉNÉRALES ---
 Véhicule : {ad_data.get('title')}
 Prix : {ad_data.get('price')} €
 Année : {ad_data.get('year')} | Km : {ad_data.get('km')}
@@ -77,50 +368,21 @@ Note Vendeur : {ad_data.get('seller_rating', 'N/A')} (sur 1.0) - {ad_data.get('s
 --- DESCRIPTION TEXTUELLE ---
 \"{description}\"
 
---- TA MISSION ---
-- IMPORTANT : Les champs "severity" doivent être compris entre 0.0 et 1.0, et refléter la gravité réelle.
-
-- IMPORTANT: Pour "risques_meca[].severity" (0.0 à 1.0), utilise cette grille:
-  * 0.05-0.15: mineur / entretien courant (petite fuite, pneus à prévoir, consommable)
-  * 0.20-0.40: défaut notable mais généralement gérable (freins, suspension fatiguée, capteur, petite fuite)
-  * 0.50-0.70: risque important / réparation coûteuse possible (embrayage, distribution incertaine, turbo, injecteurs)
-  * 0.80-1.00: critique / danger sécurité ou panne probable (moteur HS, boîte HS, surchauffe, défaut freinage majeur)
-
-- IMPORTANT: Pour "modifications[].severity" (0.0 à 1.0), utilise cette grille:
-  * 0.05-0.15: esthétique/réversible (jantes, sono, teinte ...)
-  * 0.20-0.40: modif légère (admission/échappement discret, ressorts ...)
-  * 0.50-0.70: performance (stage 1, downpipe, reprog, filtre sport ...)
-  * 0.80-1.00: modif lourde / risque légal/fiabilité (stage 2+, swap, suppression systèmes ...)
-
-- IMPORTANT: Pour "indices_arnaque[].severity" (0.0 à 1.0), utilise cette grille:
-  * 0.05-0.15: petit doute / incohérence légère (description très vague, manque d’infos, prix un peu bas sans preuve)
-  * 0.20-0.40: suspect (prix anormalement bas, vendeur évasif, incohérences, urgence/bizarreries)
-  * 0.50-0.70: très suspect (paiement inhabituel, demande d’acompte, histoire incohérente, documents flous)
-  * 0.80-1.00: quasi certain / pattern classique d’arnaque (mandat cash, escrow louche, hors plateforme, “je suis à l’étranger”, usurpation)
-
-RÉPONDS UNIQUEMENT EN JSON STRICT :
-{{
-  "ai_analysis": {{
-    "summary": "Résumé expert en 1 phrase",
-    "frais_chiffrables": [{{ "item": "ex: Pneus", "cout": 200, "raison": "Usure signalée" }}],
-    "risques_meca": [{{ "nom": "ex: Bruit moteur", "severity": 0.0 }}],
-    "modifications": [{{ "nom": "ex: Stage 1", "severity": 0.0 }}],
-    "indices_arnaque": [{{ "nom": "ex: Mandat Cash", "severity": 0.0 }}],
-    "confiance": {{
-      "points_positifs": ["liste EXACTE parmi: premiere_main, carnet_entretien, factures, suivi_garage, vendeur_pro, garantie, ct_ok"],
-      "points_negatifs": ["liste EXACTE parmi: orthographe_deplorable, ton_agressif, description_vague, cause_depart_suspecte"]
-    }},
-    "produit_evaluation": {{
-      "finition_detectee": "Nom de la finition réelle (ex: S-Line) ou 'Standard'",
-      "note_equipement_sur_10": 5,
-      "options_majeures": ["Liste 3-4 options clés"]
-    }}
-  }}
-}}
 """
 
+    def _analyze_with_model(self, ad_data: dict) -> Optional[dict]:
+        """Appel Gemini pour une annonce (sans cache)."""
+        prompt = (
+            "\nANALYSE CETTE ANNONCE :\n\n"
+            + self._ad_block(ad_data)
+            + PROMPT_MISSION
+            + "RÉPONDS UNIQUEMENT EN JSON STRICT :\n{\n  \"ai_analysis\": "
+            + ANALYSIS_SCHEMA
+            + "\n}\n"
+        )
+
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate(prompt)
             raw = getattr(response, "text", None)
             if not raw:
                 raise AIResponseError(
@@ -138,7 +400,7 @@ RÉPONDS UNIQUEMENT EN JSON STRICT :
             return None
 
     @staticmethod
-    def _safe_json_loads(text: str) -> dict:
+    def _safe_json_loads(text: str) -> dict | list:
         """
         Tente de parser du JSON strict. Si l’IA entoure de ```json ... ```,
         on nettoie proprement.
@@ -164,7 +426,12 @@ RÉPONDS UNIQUEMENT EN JSON STRICT :
             raise AIResponseError(
                 "Schéma invalide: 'ai_analysis' n’est pas un objet.")
 
-    def _calculate_score(self, gemini_data: dict, ad_data: dict) -> dict:
+    @staticmethod
+    def _calculate_score(gemini_data: dict, ad_data: dict, s_deal: float | None = None) -> dict:
+        """
+        Scores déterministes à partir de l'analyse IA + chiffres de l'annonce (aucun appel LLM).
+        s_deal : deal score déjà calculé par le PriceEngine (sinon placeholder base_scores).
+        """
         analysis = gemini_data.get("ai_analysis", {})
         conf_cfg = SCORING_CONFIG["confiance"]
         base_scores = SCORING_CONFIG["base_scores"]
@@ -225,7 +492,8 @@ RÉPONDS UNIQUEMENT EN JSON STRICT :
         cout_repa = sum((item.get("cout") or 0)
                         for item in analysis.get("frais_chiffrables", []))
         prix_virtuel = prix_affiche + cout_repa
-        s_deal = base_scores["deal"]
+        if s_deal is None:
+            s_deal = base_scores["deal"]
 
         # --- D. CONFIANCE (S_CONF) ---
         s_conf = base_scores["conf"]
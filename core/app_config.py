@@ -13,6 +13,8 @@ load_dotenv()
 @dataclass(frozen=True)
 class DatabaseConfig:
     url: str
+    upsert_batch_size: int
+    scores_batch_size: int
 
 
 @dataclass(frozen=True)
@@ -22,17 +24,61 @@ class ScraperConfig:
     request_timeout_seconds: float
     ad_page_min_sleep_seconds: float
     ad_page_max_sleep_seconds: float
+    ad_page_concurrency: int
+    max_pages_per_search: int
+    mode: str  # live | record | replay
+    speedup_factor: float
+    backoff_factor: float
+    min_delay_factor: float
+    max_delay_factor: float
+    breaker_failure_threshold: int
+    breaker_cooldown_seconds: float
+
+
+@dataclass(frozen=True)
+class HttpConfig:
+    pool_connections: int
+    pool_maxsize: int
+    max_retries: int
+    retry_backoff_factor: float
+    head_timeout_seconds: float
+
+
+@dataclass(frozen=True)
+class CacheConfig:
+    enabled: bool
+    search_ttl_seconds: int
+    ad_ttl_seconds: int
+    max_age_seconds: int
+
+
+@dataclass(frozen=True)
+class GeminiConfig:
+    concurrency: int
+    rpm: int
+    tpm: int
+    max_retries: int
+    backoff_base_seconds: float
+    backoff_max_seconds: float
+    expected_output_tokens: int
+    batch_size: int
+    batch_max_input_tokens: int
 
 
 @dataclass(frozen=True)
 class WorkerConfig:
-    gemini_sleep_seconds: float
     archive_days_threshold: int
+    market_processes: int
+    ai_cache_max_age_days: int  # <= 0 : cache d'analyses IA jamais purgé
 
 
 @dataclass(frozen=True)
 class PathsConfig:
     logs_dir: Path
+    http_cache_dir: Path
+    fixtures_dir: Path
+    scraper_state_file: Path
+    models_dir: Path
     worker_log_file: Path
     searches_dir: Path
 
@@ -46,6 +92,9 @@ class StreamlitConfig:
 class AppConfig:
     db: DatabaseConfig
     scraper: ScraperConfig
+    http: HttpConfig
+    cache: CacheConfig
+    gemini: GeminiConfig
     worker: WorkerConfig
     streamlit: StreamlitConfig
     paths: PathsConfig
@@ -67,11 +116,53 @@ def load_app_config() -> AppConfig:
             os.getenv("SCRAPER_AD_MIN_SLEEP", "1.0")),
         ad_page_max_sleep_seconds=float(
             os.getenv("SCRAPER_AD_MAX_SLEEP", "2.0")),
+        ad_page_concurrency=int(os.getenv("SCRAPER_AD_CONCURRENCY", "4")),
+        max_pages_per_search=int(os.getenv("SCRAPER_MAX_PAGES", "3")),
+        mode=os.getenv("SCRAPER_MODE", "live").strip().lower(),
+        speedup_factor=float(os.getenv("SCRAPER_SPEEDUP_FACTOR", "0.9")),
+        backoff_factor=float(os.getenv("SCRAPER_BACKOFF_FACTOR", "2.0")),
+        min_delay_factor=float(os.getenv("SCRAPER_MIN_DELAY_FACTOR", "1.0")),
+        max_delay_factor=float(os.getenv("SCRAPER_MAX_DELAY_FACTOR", "8.0")),
+        breaker_failure_threshold=int(
+            os.getenv("SCRAPER_BREAKER_FAILURES", "3")),
+        breaker_cooldown_seconds=float(
+            os.getenv("SCRAPER_BREAKER_COOLDOWN", "1800")),
+    )
+
+    http = HttpConfig(
+        pool_connections=int(os.getenv("HTTP_POOL_CONNECTIONS", "4")),
+        pool_maxsize=int(os.getenv("HTTP_POOL_MAXSIZE", "10")),
+        max_retries=int(os.getenv("HTTP_MAX_RETRIES", "2")),
+        retry_backoff_factor=float(os.getenv("HTTP_RETRY_BACKOFF", "1.0")),
+        head_timeout_seconds=float(os.getenv("HTTP_HEAD_TIMEOUT", "5")),
+    )
+
+    cache = CacheConfig(
+        enabled=os.getenv("HTTP_CACHE_ENABLED", "1").lower() in (
+            "1", "true", "yes"),
+        search_ttl_seconds=int(os.getenv("HTTP_CACHE_SEARCH_TTL", "120")),
+        ad_ttl_seconds=int(os.getenv("HTTP_CACHE_AD_TTL", "3600")),
+        max_age_seconds=int(os.getenv("HTTP_CACHE_MAX_AGE", str(7 * 86400))),
+    )
+
+    gemini = GeminiConfig(
+        concurrency=int(os.getenv("GEMINI_CONCURRENCY", "4")),
+        rpm=int(os.getenv("GEMINI_RPM", "15")),
+        tpm=int(os.getenv("GEMINI_TPM", "1000000")),
+        max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "5")),
+        backoff_base_seconds=float(os.getenv("GEMINI_BACKOFF_BASE", "2")),
+        backoff_max_seconds=float(os.getenv("GEMINI_BACKOFF_MAX", "60")),
+        expected_output_tokens=int(
+            os.getenv("GEMINI_EXPECTED_OUTPUT_TOKENS", "1000")),
+        batch_size=int(os.getenv("GEMINI_BATCH_SIZE", "5")),
+        batch_max_input_tokens=int(
+            os.getenv("GEMINI_BATCH_MAX_INPUT_TOKENS", "12000")),
     )
 
     worker = WorkerConfig(
-        gemini_sleep_seconds=float(os.getenv("WORKER_GEMINI_SLEEP", "5")),
         archive_days_threshold=int(os.getenv("WORKER_ARCHIVE_DAYS", "3")),
+        market_processes=int(os.getenv("WORKER_MARKET_PROCESSES", "0")),
+        ai_cache_max_age_days=int(os.getenv("WORKER_AI_CACHE_DAYS", "30")),
     )
 
     streamlit = StreamlitConfig(
@@ -80,6 +171,13 @@ def load_app_config() -> AppConfig:
 
     paths = PathsConfig(
         logs_dir=Path(os.getenv("LOGS_DIR", str(base_dir / "logs"))),
+        http_cache_dir=Path(
+            os.getenv("HTTP_CACHE_DIR", str(base_dir / "cache" / "http"))),
+        fixtures_dir=Path(
+            os.getenv("SCRAPER_FIXTURES_DIR", str(base_dir / "fixtures"))),
+        scraper_state_file=Path(
+            os.getenv("SCRAPER_STATE_FILE", str(base_dir / "logs" / "scraper_state.json"))),
+        models_dir=Path(os.getenv("MODELS_DIR", str(base_dir / "models"))),
         worker_log_file=Path(
             os.getenv("WORKER_LOG_FILE", str(base_dir / "logs" / "worker.log"))),
         searches_dir=Path(
@@ -87,8 +185,15 @@ def load_app_config() -> AppConfig:
     )
 
     return AppConfig(
-        db=DatabaseConfig(url=db_url),
+        db=DatabaseConfig(
+            url=db_url,
+            upsert_batch_size=int(os.getenv("DB_UPSERT_BATCH_SIZE", "500")),
+            scores_batch_size=int(os.getenv("DB_SCORES_BATCH_SIZE", "1000")),
+        ),
         scraper=scraper,
+        http=http,
+        cache=cache,
+        gemini=gemini,
         worker=worker,
         streamlit=streamlit,
         paths=paths,
@@ -0,0 +1,133 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class CompactForest:
+    """
+    Forêt de régression "à plat" : tous les noeuds de tous les arbres sont
+    concaténés dans quelques tableaux NumPy (feature, threshold, children, value).
+
+    - Les feuilles bouclent sur elles-mêmes (threshold=+inf, children=self) :
+      on descend tous les arbres en parallèle pendant max_depth itérations,
+      sans masque de feuilles.
+    - Même règle de décision que sklearn (X casté en float32, `x <= seuil` -> gauche)
+      et même ordre de sommation des arbres (accumulation séquentielle) ;
+      les NaN suivent `missing_go_to_left` du noeud, comme sklearn >= 1.3 :
+      les prédictions sont identiques bit à bit à RandomForestRegressor.predict.
+    """
+
+    feature: np.ndarray      # int32  (n_nodes,)
+    threshold: np.ndarray    # float64 (n_nodes,)
+    children: np.ndarray     # int32  (n_nodes, 2) -> [gauche, droite]
+    value: np.ndarray        # float64 (n_nodes,)
+    nan_right: np.ndarray    # bool   (n_nodes,) NaN envoyé à droite
+    roots: np.ndarray        # int32  (n_trees,) index du noeud racine de chaque arbre
+    max_depth: int
+    n_features: int
+
+    def __getstate__(self):
+        # Tables dérivées de predict_one : recalculées au besoin, jamais persistées
+        state = dict(self.__dict__)
+        state.pop("_row_tables", None)
+        return state
+
+    @classmethod
+    def from_sklearn(cls, forest) -> "CompactForest":
+        features, thresholds, children, values, nan_rights, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            node_ids = np.arange(n, dtype=np.int64)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+            children.append(np.stack([left, right], axis=1))
+            values.append(tree.value[:, 0, 0])
+            missing_left = getattr(tree, "missing_go_to_left", None)
+            nan_rights.append(np.zeros(n, dtype=bool) if missing_left is None
+                              else ~np.asarray(missing_left, dtype=bool) & ~is_leaf)
+            roots.append(offset)
+
+            max_depth = max(max_depth, int(tree.max_depth))
+            offset += n
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.concatenate(children).astype(np.int32),
+            value=np.concatenate(values).astype(np.float64),
+            nan_right=np.concatenate(nan_rights),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            n_features=int(forest.n_features_in_),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.children,
+                                      self.value, self.nan_right, self.roots))
+
+    def predict(self, X) -> np.ndarray:
+        """Prédiction (n_rows,) ; X de forme (n_rows, n_features) ou (n_features,)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        # Comparaison float32 (valeur) vs float64 (seuil), comme sklearn
+        X = X.astype(np.float64)
+
+        has_nan = bool(np.isnan(X).any())
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]]
+            go_right = x > self.threshold[nodes]
+            if has_nan:
+                go_right |= np.isnan(x) & self.nan_right[nodes]
+            nodes = self.children[nodes, go_right.astype(np.intp)]
+
+        # Somme séquentielle arbre par arbre (cumsum n'est pas "pairwise"), puis moyenne
+        leaf_values = self.value[nodes]
+        return np.cumsum(leaf_values, axis=1)[:, -1] / len(self.roots)
+
+    def _single_row_tables(self) -> tuple:
+        """
+        Tables indexées par "noeud * 2 (+ 1 si droite)" pour predict_one : l'enfant se lit
+        en un seul take (children * 2 aplati), feature / seuil / valeur sont dupliqués.
+        """
+        tables = self.__dict__.get("_row_tables")
+        if tables is None:
+            tables = (
+                np.repeat(self.feature.astype(np.intp), 2),
+                np.repeat(self.threshold, 2),
+                (self.children.astype(np.intp) * 2).ravel(),
+                np.repeat(self.value, 2),
+                self.roots.astype(np.intp) * 2,
+            )
+            self.__dict__["_row_tables"] = tables
+        return tables
+
+    def predict_one(self, x) -> float:
+        """Chemin rapide pour une seule annonce (page Details Ads, rescan)."""
+        x = np.asarray(x, dtype=np.float32).astype(np.float64)
+        if np.isnan(x).any():
+            return float(self.predict(x)[0])
+        feature, threshold, children, value, nodes = self._single_row_tables()
+        for _ in range(self.max_depth):
+            nodes = children.take(nodes + (x.take(feature.take(nodes)) > threshold.take(nodes)))
+        return float(np.cumsum(value.take(nodes))[-1] / len(self.roots))
+
+    def matches(self, forest, X) -> bool:
+        """Vérifie l'égalité exacte avec sklearn sur X (export : échantillon de lignes)."""
+        expected = forest.predict(X)
+        X_np = np.asarray(X, dtype=float)
+        if not np.array_equal(self.predict(X_np), expected):
+            return False
+        return all(self.predict_one(row) == value for row, value in zip(X_np, expected))
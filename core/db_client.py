@@ -1,22 +1,124 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from typing import Any, Dict, List, Optional
-from sqlalchemy.orm.attributes import flag_modified
-from sqlalchemy import and_
-from .models import Base, Ad
+from typing import Any, Dict, Iterator, List, Optional
+from sqlalchemy import (and_, case, cast, column, func, literal, literal_column, null, select, text,
+                        Float, Text)
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+from .models import Base, Ad, AIAnalysisCache
 from datetime import datetime, timedelta
-import requests
-from . import config
+import json
+import numpy as np
+from . import http_client
+from .request_scheduler import CircuitOpenError
 from .app_config import load_app_config
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _deep_merge(base: dict, patch: dict) -> dict:
+    """Fusion récursive (copie) de patch dans base."""
+    merged = dict(base)
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _flatten_leaves(patch: dict, prefix: tuple = ()) -> List[tuple]:
+    """
+    {"a": {"b": 1}, "c": 2} -> [(("a", "b"), 1), (("c",), 2)] (ordre trié, stable).
+    Un sous-dict vide ne produit aucune feuille (fusion sans effet, comme _deep_merge).
+    """
+    leaves = []
+    for key in sorted(patch):
+        value = patch[key]
+        if isinstance(value, dict):
+            leaves.extend(_flatten_leaves(value, prefix + (key,)))
+        else:
+            leaves.append((prefix + (key,), value))
+    return leaves
+
+
+def _paths_to_tree(paths: tuple) -> dict:
+    """(("a","b"), ("c",)) -> {"a": {"b": 0}, "c": 1} (feuille = index de colonne VALUES)."""
+    tree: dict = {}
+    for col, path in enumerate(paths):
+        node = tree
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = col
+    return tree
+
+
+def _jsonb_merge_sql(target: str, tree: dict, key_params: Dict[str, str]) -> str:
+    """
+    Expression SQL qui fusionne récursivement le patch (arbre de colonnes v.pN) dans target :
+    target || jsonb_build_object(:k_0, <feuille ou sous-fusion>, ...).
+    Les clés JSON sont passées en paramètres liés (ajoutés à key_params), jamais dans le SQL.
+    """
+    parts = []
+    for key, sub in tree.items():
+        name = f"k_{len(key_params)}"
+        key_params[name] = str(key)
+        key_sql = f"CAST(:{name} AS text)"
+        if isinstance(sub, dict):
+            child = (
+                f"COALESCE(CASE WHEN jsonb_typeof({target}->{key_sql}) = 'object' "
+                f"THEN {target}->{key_sql} END, '{{}}'::jsonb)"
+            )
+            parts.append(f"{key_sql}, {_jsonb_merge_sql(child, sub, key_params)}")
+        else:
+            parts.append(f"{key_sql}, v.p{sub}")
+    return f"({target} || jsonb_build_object({', '.join(parts)}))"
+
+
+def _scores_path_float(*path: str):
+    """scores #>> '{a,b}' casté en float (NULL si absent ou non numérique)."""
+    return case(
+        (func.jsonb_typeof(Ad.scores[path]) == "number", cast(Ad.scores[path].astext, Float)),
+        else_=null(),
+    )
+
+
+def _raw_attribute_label(key: str):
+    """value_label d'un attribut LBC de raw_data (liste [{key, value, value_label}, ...])."""
+    attrs = func.jsonb_array_elements(
+        case(
+            (func.jsonb_typeof(Ad.raw_data) == "array", Ad.raw_data),
+            else_=literal_column("'[]'::jsonb", type_=JSONB),
+        )
+    ).table_valued(column("value", JSONB)).alias("a")
+    return (
+        select(attrs.c.value["value_label"].astext)
+        .where(attrs.c.value["key"].astext == key)
+        .limit(1)
+        .correlate(Ad)
+        .scalar_subquery()
+    )
+
+
+# Somme des frais chiffrables IA (ai_analysis.frais_chiffrables[].cout), tronqués comme int()
+_REPAIR_COST_SQL = literal_column(
+    """(
+        SELECT COALESCE(SUM(TRUNC((f->>'cout')::numeric)), 0)
+        FROM jsonb_array_elements(
+            CASE WHEN jsonb_typeof(ads.ai_analysis->'frais_chiffrables') = 'array'
+                 THEN ads.ai_analysis->'frais_chiffrables' ELSE '[]'::jsonb END
+        ) AS f
+        WHERE jsonb_typeof(f->'cout') = 'number' OR (f->>'cout') ~ '^-?[0-9]+$'
+    )""",
+    type_=Float,
+)
+
+
 class DatabaseClient:
     def __init__(self, db_url: str | None = None):
+        self.db_cfg = load_app_config().db
         if db_url is None:
-            db_url = load_app_config().db.url
+            db_url = self.db_cfg.url
         logger.info(f"🔌 Tentative de connexion à {db_url}...")
         try:
             self.engine = create_engine(db_url)
@@ -27,81 +129,56 @@ class DatabaseClient:
             logger.exception(f"❌ ÉCHEC de connexion : {e}")
             raise e
 
-    def upsert_ads(self, ads_data_list: list, search_id: str):
-        session = self.Session()
+    def upsert_ads(self, ads_data_list: list, search_id: str) -> Dict[str, int]:
+        """
+        Upsert set-based (INSERT ... ON CONFLICT DO UPDATE), par lots.
+        Nombre constant d'allers-retours par lot :
+          1) SELECT id, price des annonces déjà connues (stats + détection prix)
+          2) INSERT multi-VALUES avec résolution du conflit côté PostgreSQL
+        Côté conflit :
+          - last_seen_at rafraîchi, SOLD -> ACTIVE
+          - found_by_searches : append JSONB seulement si search_id absent
+          - price_history : push de l'ancien prix seulement si le prix change
+          - ai_analysis / scores : écrasés seulement s'ils sont fournis
+        """
         stats = {"new": 0, "updated": 0, "unchanged": 0}
+        if not ads_data_list:
+            return stats
+
+        # Dédoublonnage (ON CONFLICT refuse de toucher 2x la même ligne dans un même INSERT)
+        ads_by_id: Dict[str, dict] = {}
+        for ad_dict in ads_data_list:
+            ads_by_id[str(ad_dict["id"])] = ad_dict
+        unique_ads = list(ads_by_id.values())
+
+        batch_size = max(1, int(self.db_cfg.upsert_batch_size))
+        session = self.Session()
 
         try:
-            for ad_dict in ads_data_list:
-                ad_id = ad_dict["id"]
-                current_price = int(ad_dict["price"])
-
-                existing_ad = session.query(Ad).filter_by(id=ad_id).first()
-
-                if existing_ad:
-                    # --- UPDATE ---
-                    existing_ad.last_seen_at = datetime.now()
-                    if existing_ad.status == "SOLD":
-                        existing_ad.status = "ACTIVE"
-
-                    # Update Found By
-                    current_searches = list(
-                        existing_ad.found_by_searches) if existing_ad.found_by_searches else []
-                    if search_id not in current_searches:
-                        current_searches.append(search_id)
-                        existing_ad.found_by_searches = current_searches
-
-                    # Update Price
-                    if existing_ad.price != current_price:
-                        history = list(
-                            existing_ad.price_history) if existing_ad.price_history else []
-                        history.append(
-                            {"date": datetime.now().isoformat(), "price": existing_ad.price})
-                        existing_ad.price_history = history
-                        existing_ad.price = current_price
+            for i in range(0, len(unique_ads), batch_size):
+                batch = unique_ads[i:i + batch_size]
+                now = datetime.now()
+
+                # 1) Etat existant (1 requête)
+                ids = [str(ad["id"]) for ad in batch]
+                existing_prices = dict(
+                    session.query(Ad.id, Ad.price).filter(
+                        Ad.id.in_(ids)).all()
+                )
+
+                for ad_dict in batch:
+                    ad_id = str(ad_dict["id"])
+                    if ad_id not in existing_prices:
+                        stats["new"] += 1
+                    elif existing_prices[ad_id] != int(ad_dict["price"]):
                         stats["updated"] += 1
                     else:
                         stats["unchanged"] += 1
 
-                    # Update Intelligence if present
-                    if "ai_analysis" in ad_dict:
-                        existing_ad.ai_analysis = ad_dict["ai_analysis"]
-                    if "scores" in ad_dict:
-                        existing_ad.scores = ad_dict["scores"]
-
-                else:
-                    # --- INSERT (Avec les nouveaux champs) ---
-                    new_ad = Ad(
-                        id=ad_id,
-                        found_by_searches=[search_id],
-                        title=ad_dict["title"],
-                        description=ad_dict.get("description"),  # <--- ICI
-                        url=ad_dict["url"],
-                        price=current_price,
-                        mileage=self._safe_int(ad_dict.get("km")),
-                        year=self._safe_int(ad_dict.get("year")),
-                        fuel=ad_dict.get("fuel"),
-                        gearbox=ad_dict.get("gearbox"),        # <--- ICI
-                        horsepower=ad_dict.get("horsepower"),  # <--- ICI
-                        finition=ad_dict.get("finition"),      # <--- ICI
-
-                        location=ad_dict.get("location"),
-                        zipcode=ad_dict.get("zipcode"),        # <--- ICI
-
-                        seller_rating=ad_dict.get(
-                            "seller_rating"),             # <--- ICI
-                        seller_rating_count=ad_dict.get(
-                            "seller_rating_count"),  # <--- ICI
-
-                        publication_date=self._parse_date(ad_dict.get("date")),
-                        raw_data=ad_dict.get("raw_attributes"),
-                        price_history=[],
-                        status="ACTIVE",
-                        ai_analysis=ad_dict.get("ai_analysis"),
-                        scores=ad_dict.get("scores")
-                    )
-                    session.add(new_ad)
-                    stats["new"] += 1
+                # 2) Upsert (1 requête)
+                rows = [self._ad_insert_row(ad, search_id, now)
+                        for ad in batch]
+                session.execute(self._build_upsert_stmt(rows, now))
 
             session.commit()
             logger.info(
@@ -113,6 +190,78 @@ class DatabaseClient:
         finally:
             session.close()
 
+        return stats
+
+    def _ad_insert_row(self, ad_dict: dict, search_id: str, now: datetime) -> Dict[str, Any]:
+        """Ligne complète pour l'INSERT (toutes les lignes d'un lot ont les mêmes clés)."""
+        return {
+            "id": str(ad_dict["id"]),
+            "found_by_searches": [search_id],
+            "title": ad_dict["title"],
+            "description": ad_dict.get("description"),
+            "url": ad_dict["url"],
+            "price": int(ad_dict["price"]),
+            "mileage": self._safe_int(ad_dict.get("km")),
+            "year": self._safe_int(ad_dict.get("year")),
+            "fuel": ad_dict.get("fuel"),
+            "gearbox": ad_dict.get("gearbox"),
+            "horsepower": ad_dict.get("horsepower"),
+            "finition": ad_dict.get("finition"),
+            "location": ad_dict.get("location"),
+            "zipcode": ad_dict.get("zipcode"),
+            "seller_rating": ad_dict.get("seller_rating"),
+            "seller_rating_count": ad_dict.get("seller_rating_count"),
+            "publication_date": self._parse_date(ad_dict.get("date")),
+            "first_seen_at": now,
+            "last_seen_at": now,
+            "raw_data": ad_dict.get("raw_attributes"),
+            "price_history": [],
+            "status": "ACTIVE",
+            "is_favorite": False,
+            "user_status": "NORMAL",
+            # null() => SQL NULL (et pas JSON 'null'), ce qui permet le COALESCE côté conflit
+            "ai_analysis": ad_dict["ai_analysis"] if ad_dict.get("ai_analysis") is not None else null(),
+            "scores": ad_dict["scores"] if ad_dict.get("scores") is not None else null(),
+        }
+
+    @staticmethod
+    def _build_upsert_stmt(rows: List[Dict[str, Any]], now: datetime):
+        stmt = pg_insert(Ad).values(rows)
+        excluded = stmt.excluded
+        empty_jsonb = text("'[]'::jsonb")
+
+        current_searches = func.coalesce(Ad.found_by_searches, empty_jsonb)
+        current_history = func.coalesce(Ad.price_history, empty_jsonb)
+        history_entry = func.jsonb_build_array(
+            func.jsonb_build_object(
+                cast(literal("date"), Text), cast(
+                    literal(now.isoformat()), Text),
+                cast(literal("price"), Text), Ad.price,
+            )
+        )
+
+        return stmt.on_conflict_do_update(
+            index_elements=[Ad.id],
+            set_={
+                "last_seen_at": excluded.last_seen_at,
+                "status": case((Ad.status == "SOLD", "ACTIVE"), else_=Ad.status),
+                "found_by_searches": case(
+                    (current_searches.op("@>", is_comparison=True)(
+                        excluded.found_by_searches),
+                     current_searches),
+                    else_=current_searches.op("||")(excluded.found_by_searches),
+                ),
+                "price_history": case(
+                    (Ad.price.is_distinct_from(excluded.price),
+                     current_history.op("||")(history_entry)),
+                    else_=Ad.price_history,
+                ),
+                "price": excluded.price,
+                "ai_analysis": func.coalesce(excluded.ai_analysis, Ad.ai_analysis),
+                "scores": func.coalesce(excluded.scores, Ad.scores),
+            },
+        )
+
     def archive_old_ads(self, days_threshold: int):
         """
         Vérifie les annonces qu'on n'a pas revues depuis X jours.
@@ -142,10 +291,8 @@ class DatabaseClient:
             for ad in ads_to_check:
                 try:
                     # On tente d'accéder à la page (HEAD request est plus léger que GET)
-                    # On utilise les headers pour ne pas se faire jeter
-                    headers = config.get_random_headers()
-                    r = requests.head(ad.url, headers=headers,
-                                      timeout=5, allow_redirects=True)
+                    # Session poolée (keep-alive) + headers rotatifs pour ne pas se faire jeter
+                    r = http_client.head(ad.url, allow_redirects=True)
 
                     # Leboncoin redirige souvent vers la home ou une page de recherche si l'annonce est off
                     # Si l'URL finale n'est pas l'URL de l'annonce, c'est suspect.
@@ -166,6 +313,10 @@ class DatabaseClient:
                         ad.status = "SOLD"
                         archived_count += 1
 
+                except CircuitOpenError as e:
+                    # Blocage détecté : on arrête les pings, le reste sera vérifié au prochain run
+                    logger.warning(f"   ⛔ Ménage interrompu : {e}")
+                    break
                 except Exception:
                     # En cas d'erreur technique (timeout), dans le doute, on garde.
                     pass
@@ -200,6 +351,174 @@ class DatabaseClient:
         finally:
             session.close()
 
+    def get_existing_ad_ids(self, ad_ids: List[str]) -> set[str]:
+        """Retourne (en 1 requête) le sous-ensemble des ids déjà présents en base."""
+        ids = list({str(ad_id) for ad_id in ad_ids if ad_id})
+        if not ids:
+            return set()
+
+        session = self.Session()
+        try:
+            rows = session.query(Ad.id).filter(Ad.id.in_(ids)).all()
+            return {ad_id for (ad_id,) in rows}
+        except Exception:
+            logger.exception("❌ Erreur get_existing_ad_ids")
+            return set()
+        finally:
+            session.close()
+
+    def get_analyzed_ad_ids(self, ad_ids: List[str]) -> set[str]:
+        """
+        Version batch de is_ad_analyzed : une seule requête (index PK) pour toute la page.
+        Retourne l'ensemble des ids déjà en base ET possédant une analyse IA non vide.
+        """
+        ids = list({str(ad_id) for ad_id in ad_ids if ad_id})
+        if not ids:
+            return set()
+
+        session = self.Session()
+        try:
+            rows = (
+                session.query(Ad.id)
+                .filter(
+                    Ad.id.in_(ids),
+                    func.jsonb_typeof(Ad.ai_analysis) == "object",
+                    Ad.ai_analysis.op("<>")(text("'{}'::jsonb")),
+                )
+                .all()
+            )
+            return {ad_id for (ad_id,) in rows}
+        except Exception:
+            logger.exception("❌ Erreur get_analyzed_ad_ids")
+            return set()
+        finally:
+            session.close()
+
+    def get_triaged_ad_ids(self, ad_ids: List[str]) -> set[str]:
+        """
+        Ids déjà en base marqués par le triage pré-LLM (scores.triage), pour ne pas
+        les recompter à chaque passage tant qu'ils restent en ligne sans analyse IA.
+        """
+        ids = list({str(ad_id) for ad_id in ad_ids if ad_id})
+        if not ids:
+            return set()
+
+        session = self.Session()
+        try:
+            rows = (
+                session.query(Ad.id)
+                .filter(
+                    Ad.id.in_(ids),
+                    func.jsonb_typeof(Ad.scores) == "object",
+                    Ad.scores.has_key("triage"),
+                )
+                .all()
+            )
+            return {ad_id for (ad_id,) in rows}
+        except Exception:
+            logger.exception("❌ Erreur get_triaged_ad_ids")
+            return set()
+        finally:
+            session.close()
+
+    def iter_ads_for_rescoring(self, chunk_size: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Annonces possédant une analyse IA, streamées par paquets (yield_per) :
+        uniquement les champs lus par AIAnalyst._calculate_score + scores stockés.
+        """
+        session = self.Session()
+        try:
+            query = (
+                session.query(
+                    Ad.id, Ad.price, Ad.description, Ad.seller_rating,
+                    func.coalesce(Ad.seller_rating_count, 0).label("seller_rating_count"),
+                    Ad.ai_analysis,
+                    Ad.scores.label("cur_scores"),
+                    _scores_path_float("base", "deal").label("cur_deal"),
+                    _scores_path_float("total").label("cur_total"),
+                )
+                .filter(
+                    func.jsonb_typeof(Ad.ai_analysis) == "object",
+                    Ad.ai_analysis.op("<>")(text("'{}'::jsonb")),
+                )
+                .yield_per(chunk_size)
+            )
+            chunk: List[Dict[str, Any]] = []
+            for row in query:
+                chunk.append(dict(row._mapping))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+        finally:
+            session.close()
+
+    def fetch_cached_analyses(self, content_hashes: List[str]) -> Dict[str, dict]:
+        """
+        Cache d'analyses IA : {content_hash: ai_analysis} pour les hashes connus.
+        Une seule requête (UPDATE ... RETURNING) qui compte aussi les hits.
+        """
+        hashes = list({h for h in content_hashes if h})
+        if not hashes:
+            return {}
+
+        session = self.Session()
+        try:
+            rows = session.execute(
+                AIAnalysisCache.__table__.update()
+                .where(AIAnalysisCache.content_hash.in_(hashes))
+                .values(hit_count=AIAnalysisCache.hit_count + 1, last_hit_at=datetime.now())
+                .returning(AIAnalysisCache.content_hash, AIAnalysisCache.ai_analysis)
+            ).all()
+            session.commit()
+            return {content_hash: analysis for content_hash, analysis in rows}
+        except Exception:
+            session.rollback()
+            logger.exception("❌ Erreur fetch_cached_analyses")
+            return {}
+        finally:
+            session.close()
+
+    def store_cached_analyses(self, entries: List[Dict[str, Any]]) -> None:
+        """entries = [{"content_hash", "ai_analysis", "source_ad_id"}, ...] ; hash existant => ignoré."""
+        rows = list({e["content_hash"]: e for e in entries if e.get("content_hash")}.values())
+        if not rows:
+            return
+
+        now = datetime.now()
+        session = self.Session()
+        try:
+            session.execute(
+                pg_insert(AIAnalysisCache)
+                .values([{**row, "created_at": now, "hit_count": 0} for row in rows])
+                .on_conflict_do_nothing(index_elements=[AIAnalysisCache.content_hash])
+            )
+            session.commit()
+        except Exception:
+            session.rollback()
+            logger.exception("❌ Erreur store_cached_analyses")
+        finally:
+            session.close()
+
+    def prune_cached_analyses(self, max_age_days: int) -> int:
+        """Supprime les analyses en cache non utilisées (ni créées ni servies) depuis max_age_days."""
+        session = self.Session()
+        try:
+            limit_date = datetime.now() - timedelta(days=max_age_days)
+            removed = session.query(AIAnalysisCache).filter(
+                func.coalesce(AIAnalysisCache.last_hit_at,
+                              AIAnalysisCache.created_at) < limit_date
+            ).delete(synchronize_session=False)
+            session.commit()
+            return removed
+        except Exception:
+            session.rollback()
+            logger.exception("❌ Erreur prune_cached_analyses")
+            return 0
+        finally:
+            session.close()
+
     def _safe_int(self, value):
         if not value:
             return None
@@ -218,95 +537,135 @@ class DatabaseClient:
         except:
             return datetime.now()
 
-    def fetch_ads_for_price_training(self, search_id: str) -> List[Dict[str, Any]]:
+    def fetch_market_data(self, search_id: str, with_identity: bool = False) -> Dict[str, np.ndarray]:
         """
-        Renvoie les champs nécessaires à la construction du dataset de training
-        (y compris veto: k_arnaque, status, user_status, has_scores).
+        Lecture unique (training + scoring) des annonces d'une recherche, en colonnes.
+        Seuls les champs JSON réellement utilisés sont extraits côté PostgreSQL
+        (chemins JSONB), les documents scores / ai_analysis ne sont jamais chargés.
+        Les lignes sont streamées (yield_per) et empilées en tableaux NumPy.
+        with_identity : + marque / modèle (raw_data), pour le modèle global uniquement.
         """
+        columns = {
+            "id": Ad.id,
+            "price": Ad.price,
+            "year": Ad.year,
+            "mileage": Ad.mileage,
+            "horsepower": Ad.horsepower,
+            # secondes "murales" (timestamp sans fuseau) : seuls les écarts servent (décroissance)
+            "last_seen": func.extract("epoch", Ad.last_seen_at),
+            "status": Ad.status,
+            "user_status": Ad.user_status,
+            # identité véhicule (modèle prix global)
+            "title": Ad.title,
+            "has_scores": and_(
+                func.jsonb_typeof(Ad.scores) == "object",
+                Ad.scores.op("<>")(text("'{}'::jsonb")),
+            ),
+            "k_arnaque": _scores_path_float("sanity_checks", "k_arnaque"),
+            "k_meca": _scores_path_float("sanity_checks", "k_meca"),
+            "k_modif": _scores_path_float("sanity_checks", "k_modif"),
+            "conf": _scores_path_float("base", "conf"),
+            "prod": _scores_path_float("base", "prod"),
+            "repair_cost": _REPAIR_COST_SQL,
+            # valeurs stockées (dirty-tracking côté PriceEngine)
+            "cur_deal": _scores_path_float("base", "deal"),
+            "cur_market_estimation": _scores_path_float("financial", "market_estimation"),
+            "cur_virtual_price": _scores_path_float("financial", "virtual_price"),
+            "cur_total": _scores_path_float("total"),
+        }
+        if with_identity:
+            # Sous-requêtes corrélées sur raw_data : seulement si le modèle global est actif
+            columns["brand"] = _raw_attribute_label("u_car_brand")
+            columns["model"] = _raw_attribute_label("u_car_model")
+
         session = self.Session()
         try:
-            ads = (
-                session.query(
-                    Ad.price, Ad.year, Ad.mileage, Ad.horsepower,
-                    Ad.scores, Ad.status, Ad.user_status
-                )
+            query = (
+                session.query(*[col.label(name) for name, col in columns.items()])
                 .filter(Ad.found_by_searches.contains([search_id]))
-                .all()
+                .yield_per(5000)
             )
 
-            rows: List[Dict[str, Any]] = []
-            for price, year, mileage, horsepower, scores, status, user_status in ads:
-                scores_dict = scores or {}
-                sanity = scores_dict.get("sanity_checks", {})
-                rows.append({
-                    "price": price,
-                    "year": year,
-                    "mileage": mileage,
-                    "horsepower": horsepower,
-                    "k_arnaque": sanity.get("k_arnaque"),
-                    "status": status,
-                    "user_status": user_status,
-                    "has_scores": bool(scores),
-                })
-            return rows
-        finally:
-            session.close()
-
-    def fetch_active_ads_for_deal_update(self, search_id: str) -> List[Dict[str, Any]]:
-        """
-        Renvoie les champs nécessaires pour recalculer S_Deal sur les annonces actives.
-        On renvoie des dicts pour éviter de manipuler directement des objets ORM dans PriceEngine.
-        """
-        session = self.Session()
-        try:
-            ads = (
-                session.query(
-                    Ad.id, Ad.price, Ad.year, Ad.mileage, Ad.horsepower,
-                    Ad.ai_analysis, Ad.scores
-                )
-                .filter(
-                    Ad.found_by_searches.contains([search_id]),
-                    Ad.status == "ACTIVE"
-                )
-                .all()
-            )
+            data: Dict[str, list] = {name: [] for name in columns}
+            for row in query:
+                for name, value in zip(columns, row):
+                    data[name].append(value)
 
-            rows: List[Dict[str, Any]] = []
-            for ad_id, price, year, mileage, horsepower, ai_analysis, scores in ads:
-                rows.append({
-                    "id": ad_id,
-                    "price": price,
-                    "year": year,
-                    "mileage": mileage,
-                    "horsepower": horsepower,
-                    "ai_analysis": ai_analysis or {},
-                    "scores": scores or {},
-                })
-            return rows
+            text_cols = {"id", "status", "user_status", "title", "brand", "model", "has_scores"}
+            return {
+                name: np.array(values, dtype=object) if name in text_cols
+                else np.array([np.nan if v is None else v for v in values], dtype=float)
+                for name, values in data.items()
+            }
         finally:
             session.close()
 
     def bulk_update_scores(self, updates: List[Dict[str, Any]]) -> int:
         """
         updates = [{"id": "...", "scores": {...}}, ...]
-        Retourne le nombre d'updates appliquées.
+        "scores" peut être partiel (patch) : il est fusionné récursivement dans
+        les scores existants (ex: {"base": {"deal": 80}, "total": 61.5}).
+
+        Ecriture set-based : les patchs de même forme sont regroupés et appliqués
+        par lots (DB_SCORES_BATCH_SIZE) avec un seul
+        UPDATE ads SET scores = <merge> FROM (VALUES ...) v WHERE ads.id = v.id
+        où seules les sous-clés du patch sont réécrites (les autres sont conservées).
+        Pour un même id, les patchs successifs sont fusionnés (le dernier gagne).
+        Retourne le nombre de lignes mises à jour.
         """
         if not updates:
             return 0
 
+        # 1) Fusion des doublons (ordre conservé) ; patch vide => rien à écrire
+        merged: Dict[str, dict] = {}
+        for upd in updates:
+            ad_id = str(upd["id"])
+            merged[ad_id] = _deep_merge(merged.get(ad_id, {}), upd["scores"] or {})
+
+        # 2) Regroupement par forme de patch (mêmes chemins feuilles => même SQL)
+        groups: Dict[tuple, List[tuple]] = {}
+        for ad_id, patch in merged.items():
+            leaves = _flatten_leaves(patch)
+            if not leaves:
+                continue
+            shape = tuple(path for path, _ in leaves)
+            groups.setdefault(shape, []).append(
+                (ad_id, [value for _, value in leaves]))
+
+        if not groups:
+            return 0
+
+        batch_size = max(1, int(self.db_cfg.scores_batch_size))
         session = self.Session()
         try:
             count = 0
-            for upd in updates:
-                ad_id = upd["id"]
-                new_scores = upd["scores"]
-                ad = session.query(Ad).filter_by(id=ad_id).first()
-                if not ad:
-                    continue
-
-                ad.scores = dict(new_scores)  # assignation explicite
-                flag_modified(ad, "scores")
-                count += 1
+            for shape, rows in groups.items():
+                key_params: Dict[str, str] = {}
+                set_expr = _jsonb_merge_sql(
+                    "(CASE WHEN jsonb_typeof(ads.scores) = 'object' THEN ads.scores ELSE '{}'::jsonb END)",
+                    _paths_to_tree(shape),
+                    key_params,
+                )
+                columns = ", ".join(f"p{c}" for c in range(len(shape)))
+
+                for i in range(0, len(rows), batch_size):
+                    chunk = rows[i:i + batch_size]
+                    params: Dict[str, Any] = dict(key_params)
+                    values_sql = []
+                    for r, (ad_id, values) in enumerate(chunk):
+                        params[f"id_{r}"] = ad_id
+                        placeholders = [f":id_{r}"]
+                        for c, value in enumerate(values):
+                            params[f"p_{r}_{c}"] = json.dumps(value)
+                            placeholders.append(f"CAST(:p_{r}_{c} AS jsonb)")
+                        values_sql.append(f"({', '.join(placeholders)})")
+
+                    sql = (
+                        f"UPDATE ads SET scores = {set_expr} "
+                        f"FROM (VALUES {', '.join(values_sql)}) AS v(id, {columns}) "
+                        "WHERE ads.id = v.id"
+                    )
+                    count += session.execute(text(sql), params).rowcount
 
             session.commit()
             return count
@@ -0,0 +1,74 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+from .app_config import load_app_config
+from .http_cache import CachedResponse, ResponseCache
+
+logger = logging.getLogger(__name__)
+
+MODE_LIVE = "live"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+
+class FixtureStore:
+    """
+    Enregistrement / rejeu des réponses brutes du scraper (SCRAPER_MODE).
+
+    - record : chaque page recherche / annonce obtenue est écrite telle quelle
+      dans <fixtures_dir>/<kind>/<clé>.html (+ .json : url, params, status)
+    - replay : les pages sont resservies depuis ce dossier, sans aucun réseau
+      ni pause de politesse (profilage hors ligne, CI, laptop)
+    La clé est la même que celle du cache HTTP (URL + params triés).
+    """
+
+    def __init__(self, fixtures_dir: Path):
+        self.dir = Path(fixtures_dir)
+        self._lock = threading.Lock()
+
+    def _paths(self, url: str, params: dict | None, kind: str) -> tuple[Path, Path]:
+        key = ResponseCache.make_key(url, params)
+        folder = self.dir / kind
+        return folder / f"{key}.html", folder / f"{key}.json"
+
+    def record(self, url: str, params: dict | None, kind: str, response: CachedResponse) -> None:
+        body_path, meta_path = self._paths(url, params, kind)
+        with self._lock:
+            body_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = body_path.with_suffix(".html.tmp")
+            tmp.write_bytes(response.content)
+            os.replace(tmp, body_path)
+            meta_path.write_text(json.dumps({
+                "url": url,
+                "params": params,
+                "kind": kind,
+                "status_code": response.status_code,
+            }, ensure_ascii=False), encoding="utf-8")
+
+    def replay(self, url: str, params: dict | None, kind: str) -> CachedResponse | None:
+        body_path, meta_path = self._paths(url, params, kind)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            body = body_path.read_bytes()
+        except FileNotFoundError:
+            logger.warning("📼 Replay : aucune fixture pour %s %s", url, params or "")
+            return None
+        return CachedResponse(int(meta.get("status_code", 200)), body, from_cache=True)
+
+    def iter_bodies(self, kind: str):
+        """Parcourt les corps enregistrés d'un type (bench hors ligne)."""
+        for body_path in sorted((self.dir / kind).glob("*.html")):
+            yield body_path.read_bytes()
+
+
+_STORE: FixtureStore | None = None
+
+
+def get_store() -> FixtureStore:
+    global _STORE
+    if _STORE is None:
+        _STORE = FixtureStore(load_app_config().paths.fixtures_dir)
+    return _STORE
@@ -0,0 +1,185 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import urlencode
+
+try:  # zstd si dispo (plus rapide/compact), sinon gzip stdlib
+    import zstandard as _zstd
+except ImportError:  # pragma: no cover - fallback stdlib
+    _zstd = None
+
+from . import http_client
+from .app_config import CacheConfig, load_app_config
+
+logger = logging.getLogger(__name__)
+
+KIND_SEARCH = "search"
+KIND_AD = "ad"
+
+
+@dataclass
+class CachedResponse:
+    status_code: int
+    content: bytes
+    from_cache: bool = False
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+
+class ResponseCache:
+    """
+    Cache disque des pages LBC (recherche / annonce), clé = URL + params.
+
+    Chaque entrée = corps compressé (<clé>.bin) + métadonnées JSON (<clé>.json :
+    date de fetch, codec, ETag, Last-Modified). Une entrée plus jeune que le TTL
+    de son type est servie sans réseau ; au-delà, on revalide avec
+    If-None-Match / If-Modified-Since quand le serveur a fourni ces en-têtes
+    (304 -> on garde le corps et on rafraîchit la date).
+    Seules les réponses 200 sont stockées.
+    """
+
+    def __init__(self, cfg: CacheConfig, cache_dir: Path):
+        self.cfg = cfg
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Clés / stockage
+    # ------------------------------------------------------------------
+    @staticmethod
+    def make_key(url: str, params: dict | None = None) -> str:
+        query = urlencode(sorted((params or {}).items()), doseq=True)
+        return hashlib.sha256(f"{url}?{query}".encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.dir / f"{key}.bin", self.dir / f"{key}.json"
+
+    def _ttl(self, kind: str) -> int:
+        return self.cfg.search_ttl_seconds if kind == KIND_SEARCH else self.cfg.ad_ttl_seconds
+
+    @staticmethod
+    def _compress(body: bytes) -> tuple[str, bytes]:
+        if _zstd is not None:
+            return "zstd", _zstd.ZstdCompressor(level=3).compress(body)
+        return "gzip", gzip.compress(body, compresslevel=6)
+
+    @staticmethod
+    def _decompress(codec: str, blob: bytes) -> bytes:
+        if codec == "zstd":
+            if _zstd is None:
+                raise ValueError("entrée zstd mais module zstandard absent")
+            return _zstd.ZstdDecompressor().decompress(blob)
+        return gzip.decompress(blob)
+
+    def _load(self, key: str) -> tuple[dict, bytes] | None:
+        body_path, meta_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            body = self._decompress(meta.get("codec", "gzip"),
+                                    body_path.read_bytes())
+            return meta, body
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("🗄️ Entrée cache illisible (%s): %s", key[:12], e)
+            return None
+
+    def _store(self, key: str, meta: dict, body: bytes | None = None) -> None:
+        body_path, meta_path = self._paths(key)
+        with self._lock:
+            if body is not None:
+                meta["codec"], blob = self._compress(body)
+                tmp = body_path.with_suffix(".bin.tmp")
+                tmp.write_bytes(blob)
+                os.replace(tmp, body_path)
+            tmp = meta_path.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(meta), encoding="utf-8")
+            os.replace(tmp, meta_path)
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+    def get_fresh(self, url: str, params: dict | None, kind: str) -> CachedResponse | None:
+        """Entrée encore dans son TTL (aucun appel réseau), sinon None."""
+        if not self.cfg.enabled:
+            return None
+        entry = self._load(self.make_key(url, params))
+        if not entry:
+            return None
+        meta, body = entry
+        if time.time() - float(meta.get("fetched_at", 0)) > self._ttl(kind):
+            return None
+        return CachedResponse(200, body, from_cache=True)
+
+    def fetch(self, url: str, params: dict | None, kind: str, timeout: float | None = None) -> CachedResponse:
+        """GET réseau (conditionnel si possible) puis mise à jour du cache."""
+        key = self.make_key(url, params)
+        entry = self._load(key) if self.cfg.enabled else None
+
+        validators = {}
+        if entry:
+            meta, _ = entry
+            if meta.get("etag"):
+                validators["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                validators["If-Modified-Since"] = meta["last_modified"]
+
+        response = http_client.get(
+            url, params=params, timeout=timeout, extra_headers=validators or None)
+
+        if response.status_code == 304 and entry:
+            meta, body = entry
+            meta["fetched_at"] = time.time()
+            self._store(key, meta)
+            logger.debug("🗄️ 304 Not Modified : %s", url)
+            return CachedResponse(200, body, from_cache=True)
+
+        if response.status_code == 200 and self.cfg.enabled:
+            self._store(key, {
+                "url": url,
+                "kind": kind,
+                "fetched_at": time.time(),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }, response.content)
+
+        return CachedResponse(response.status_code, response.content)
+
+    def prune(self) -> int:
+        """Supprime les entrées plus vieilles que HTTP_CACHE_MAX_AGE. Retourne le nb supprimé."""
+        limit = time.time() - self.cfg.max_age_seconds
+        removed = 0
+        for meta_path in self.dir.glob("*.json"):
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                if float(meta.get("fetched_at", 0)) >= limit:
+                    continue
+                for path in self._paths(meta_path.stem):
+                    path.unlink(missing_ok=True)
+                removed += 1
+            except Exception:
+                continue
+        return removed
+
+
+_CACHE: ResponseCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                cfg = load_app_config()
+                _CACHE = ResponseCache(cfg.cache, cfg.paths.http_cache_dir)
+    return _CACHE
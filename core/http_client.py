@@ -0,0 +1,91 @@
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import config
+from .app_config import load_app_config
+from .request_scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Session unique (pool keep-alive) partagée par scraper, archivage et rescan
+_SESSION: requests.Session | None = None
+_SESSION_LOCK = threading.Lock()
+
+
+def _build_session() -> requests.Session:
+    cfg = load_app_config().http
+
+    # Retries uniquement sur erreurs transitoires (connexion / 5xx).
+    # Jamais sur 403 : c'est un blocage Datadome, insister aggrave le cas.
+    retry = Retry(
+        total=cfg.max_retries,
+        connect=cfg.max_retries,
+        read=cfg.max_retries,
+        status=cfg.max_retries,
+        backoff_factor=cfg.retry_backoff_factor,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=cfg.pool_connections,
+        pool_maxsize=cfg.pool_maxsize,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    logger.info(
+        "🌐 Session HTTP initialisée (pool=%s/%s, retries=%s)",
+        cfg.pool_connections, cfg.pool_maxsize, cfg.max_retries)
+    return session
+
+
+def get_session() -> requests.Session:
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                _SESSION = _build_session()
+    return _SESSION
+
+
+def _send(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Envoi via la session poolée, sous contrôle du scheduler :
+    refus si disjoncteur ouvert, puis retour d'état (cadence / disjoncteur).
+    """
+    scheduler = get_scheduler()
+    scheduler.check()
+    try:
+        response = get_session().request(method, url, **kwargs)
+    except requests.RequestException:
+        scheduler.record(None)
+        raise
+    scheduler.record(response.status_code)
+    return response
+
+
+def get(url: str, params: dict | None = None, timeout: float | None = None,
+        extra_headers: dict | None = None) -> requests.Response:
+    """GET via la session poolée (headers rotatifs, timeout AppConfig par défaut)."""
+    if timeout is None:
+        timeout = load_app_config().scraper.request_timeout_seconds
+    headers = config.get_random_headers()
+    if extra_headers:
+        headers.update(extra_headers)
+    return _send("GET", url, params=params, headers=headers, timeout=timeout)
+
+
+def head(url: str, timeout: float | None = None, allow_redirects: bool = True) -> requests.Response:
+    """HEAD via la session poolée (ping de disponibilité d'une annonce)."""
+    if timeout is None:
+        timeout = load_app_config().http.head_timeout_seconds
+    return _send("HEAD", url, headers=config.get_random_headers(),
+                 timeout=timeout, allow_redirects=allow_redirects)
@@ -0,0 +1,48 @@
+import re
+from functools import lru_cache
+from typing import Iterable, Optional
+
+
+class KeywordMatcher:
+    """
+    Matcher mono-passe pour une liste de mots-clés (whitelist / blacklist).
+
+    Tous les mots-clés sont compilés dans UNE regex d'alternance : un seul scan
+    du titre au lieu de O(nb_mots_clés) recherches de sous-chaîne.
+    - word_boundary=False : même sémantique que `kw in title` (sous-chaîne)
+    - word_boundary=True  : le mot-clé doit être délimité (évite "na" dans "canada")
+    """
+
+    def __init__(self, keywords: Iterable[str], word_boundary: bool = False):
+        # Plus longs d'abord : à position égale, on rapporte le mot-clé le plus précis
+        self.keywords = sorted({k for k in keywords if k}, key=len, reverse=True)
+        self.word_boundary = word_boundary
+
+        if not self.keywords:
+            self._regex = None
+            return
+
+        alternation = "|".join(re.escape(k) for k in self.keywords)
+        if word_boundary:
+            alternation = rf"(?<!\w)(?:{alternation})(?!\w)"
+        self._regex = re.compile(alternation)
+
+    def __bool__(self) -> bool:
+        return self._regex is not None
+
+    def find(self, text: str) -> Optional[str]:
+        """Retourne le premier mot-clé trouvé dans text, ou None."""
+        if self._regex is None:
+            return None
+        m = self._regex.search(text)
+        return m.group(0) if m else None
+
+
+@lru_cache(maxsize=256)
+def _compiled(keywords: tuple, word_boundary: bool) -> KeywordMatcher:
+    return KeywordMatcher(keywords, word_boundary=word_boundary)
+
+
+def get_matcher(keywords: Iterable[str] | None, word_boundary: bool = False) -> KeywordMatcher:
+    """Matcher compilé une fois par liste de mots-clés (cache partagé entre runs)."""
+    return _compiled(tuple(keywords or ()), bool(word_boundary))
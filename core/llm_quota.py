@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from .app_config import load_app_config
+
+# Fenêtre glissante des quotas Gemini (RPM / TPM)
+WINDOW_SECONDS = 60.0
+
+
+class QuotaLimiter:
+    """
+    Budget requêtes/minute + tokens/minute sur fenêtre glissante, thread-safe.
+
+    acquire(tokens) bloque jusqu'à ce que la requête tienne dans les deux budgets,
+    puis réserve une estimation de tokens ; settle() la remplace par la consommation
+    réelle (usage_metadata) une fois la réponse reçue.
+    rpm / tpm <= 0 => budget correspondant illimité.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = int(rpm)
+        self.tpm = int(tpm)
+        self._cond = threading.Condition()
+        self._events: deque = deque()  # [timestamp, tokens]
+
+    def _purge(self, now: float) -> None:
+        while self._events and now - self._events[0][0] >= WINDOW_SECONDS:
+            self._events.popleft()
+
+    def _wait_time(self, now: float, tokens: int) -> float:
+        waits = [0.0]
+        if self.rpm > 0 and len(self._events) >= self.rpm:
+            waits.append(self._events[len(self._events) - self.rpm][0] + WINDOW_SECONDS - now)
+        if self.tpm > 0 and self._events:
+            # Libère les plus anciennes réservations jusqu'à faire de la place
+            # (une requête plus grosse que le budget passe seule dans la fenêtre)
+            used = sum(e[1] for e in self._events)
+            for ts, spent in self._events:
+                if used + tokens <= self.tpm:
+                    break
+                used -= spent
+                waits.append(ts + WINDOW_SECONDS - now)
+        return max(waits)
+
+    def acquire(self, tokens: int = 0) -> list:
+        """Bloque jusqu'au créneau ; retourne la réservation à passer à settle()."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._purge(now)
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    event = [now, int(tokens)]
+                    self._events.append(event)
+                    return event
+                self._cond.wait(timeout=wait)
+
+    def settle(self, reservation: list, actual_tokens: Optional[int]) -> None:
+        if actual_tokens is None:
+            return
+        with self._cond:
+            reservation[1] = int(actual_tokens)
+            self._cond.notify_all()
+
+
+_LIMITER: QuotaLimiter | None = None
+_LIMITER_LOCK = threading.Lock()
+
+
+def get_quota_limiter() -> QuotaLimiter:
+    """Limiteur partagé par tous les threads d'analyse du process (quota = clé API)."""
+    global _LIMITER
+    with _LIMITER_LOCK:
+        if _LIMITER is None:
+            cfg = load_app_config().gemini
+            _LIMITER = QuotaLimiter(cfg.rpm, cfg.tpm)
+        return _LIMITER
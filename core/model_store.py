@@ -0,0 +1,96 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from .app_config import load_app_config
+from .scoring_config import SCORING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Colonnes du dataset d'entraînement
+# last_seen : epoch last_seen_at, ne sert qu'à dériver age_days (poids de décroissance)
+TRAINING_COLUMNS = ["price", "year", "mileage", "horsepower", "last_seen"]
+
+# Colonnes hachées dans l'empreinte (ordre figé). Jamais l'epoch brut last_seen :
+# upsert_ads / rescans le rafraîchissent à chaque passage, le cache modèle ne servirait plus.
+FINGERPRINT_COLUMNS = ["price", "year", "mileage", "horsepower", "age_days"]
+
+
+def add_age_days(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ajoute age_days : ancienneté en jours calendaires entiers par rapport au jour
+    de l'annonce la plus récente. Stable au sein d'une journée (plusieurs runs,
+    rescans), elle ne bouge qu'au changement de jour. Date inconnue => NaN.
+    """
+    if "last_seen" not in df.columns:
+        return df
+    days = np.floor(pd.to_numeric(df["last_seen"], errors="coerce") / 86400.0)
+    return df.assign(age_days=days.max() - days)
+
+
+def dataset_fingerprint(df: pd.DataFrame, extra_columns: Sequence[str] = ()) -> str:
+    """
+    Empreinte du dataset filtré + de la section price_engine de SCORING_CONFIG.
+    Le df doit être trié de façon canonique (cf. PriceEngine.train) pour que
+    l'ordre de lecture SQL n'influe pas sur l'empreinte.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps(SCORING_CONFIG["price_engine"],
+             sort_keys=True, default=str).encode("utf-8"))
+    cols = [c for c in [*FINGERPRINT_COLUMNS, *extra_columns] if c in df.columns]
+    h.update(",".join(cols).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(
+        df[cols], index=False).values.tobytes())
+    return h.hexdigest()
+
+
+class ModelStore:
+    """
+    Persistance disque des modèles prix, un fichier par recherche :
+    <models_dir>/<search_id>.joblib = {fingerprint, model, compact, grid, model_meta, r2_score}.
+    Un modèle n'est rechargé que si l'empreinte demandée correspond
+    (fingerprint=None : dernier modèle persisté, quel que soit le dataset).
+    """
+
+    def __init__(self, models_dir: Path | None = None):
+        self.dir = Path(models_dir or load_app_config().paths.models_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, search_id: str) -> Path:
+        return self.dir / f"{search_id}.joblib"
+
+    def load(self, search_id: str, fingerprint: str | None = None) -> Optional[Dict[str, Any]]:
+        path = self._path(search_id)
+        if not path.exists():
+            return None
+        try:
+            bundle = joblib.load(path)
+        except Exception as e:
+            logger.warning(
+                "Modèle persisté illisible [search=%s]: %s", search_id, e)
+            return None
+        if fingerprint is not None and bundle.get("fingerprint") != fingerprint:
+            return None
+        return bundle
+
+    def save(self, search_id: str, bundle: Dict[str, Any]) -> None:
+        path = self._path(search_id)
+        # Fichier temporaire unique : worker et rescan du dashboard peuvent écrire la même recherche
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f"{search_id}.", suffix=".tmp",
+                                         delete=False) as tmp:
+            tmp_path = Path(tmp.name)
+        try:
+            joblib.dump(bundle, tmp_path, compress=3)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
+            logger.warning(
+                "Impossible de persister le modèle [search=%s]: %s", search_id, e)
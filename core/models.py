@@ -63,3 +63,18 @@ class Ad(Base):
 
     def __repr__(self):
         return f"<Ad {self.id} [{self.status}] : {self.title} ({self.price}€)>"
+
+
+class AIAnalysisCache(Base):
+    """
+    Cache des analyses IA, adressé par le contenu de l'annonce (hash des entrées
+    normalisées du prompt) : une annonce republiée sous un autre id réutilise l'analyse.
+    """
+    __tablename__ = "ai_analysis_cache"
+
+    content_hash = Column(String(64), primary_key=True)
+    ai_analysis = Column(JSONB, nullable=False)
+    source_ad_id = Column(String)  # 1ère annonce analysée avec ce contenu
+    created_at = Column(DateTime, default=datetime.now)
+    last_hit_at = Column(DateTime, nullable=True)
+    hit_count = Column(Integer, default=0)
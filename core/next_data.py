@@ -0,0 +1,56 @@
+import json
+import logging
+from typing import Any, Optional
+
+try:  # parseur JSON rapide (optionnel)
+    import orjson as _fast_json
+except ImportError:  # pragma: no cover - fallback stdlib
+    _fast_json = None
+
+logger = logging.getLogger(__name__)
+
+_MARKER = b'__NEXT_DATA__'
+_SCRIPT_OPEN = b'<script'
+_SCRIPT_CLOSE = b'</script>'
+
+
+def _loads(payload: bytes) -> Any:
+    if _fast_json is not None:
+        return _fast_json.loads(payload)
+    return json.loads(payload)
+
+
+def extract_next_data(body: bytes | str | None) -> Optional[dict]:
+    """
+    Extrait le JSON de <script id="__NEXT_DATA__"> sans construire d'arbre HTML.
+
+    On localise le marqueur dans les octets bruts, on remonte à la balise <script>
+    qui le porte, puis on découpe jusqu'au </script> suivant. Next.js échappe les
+    "<" dans ce payload, donc le premier </script> est forcément le bon.
+    Retourne None si la balise est absente ou si le JSON est invalide.
+    """
+    if not body:
+        return None
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+
+    pos = body.find(_MARKER)
+    while pos != -1:
+        tag_start = body.rfind(_SCRIPT_OPEN, 0, pos)
+        # Le marqueur doit être un attribut de la balise <script ...> (pas du texte)
+        if tag_start != -1 and body.find(b">", tag_start, pos) == -1:
+            content_start = body.find(b">", pos)
+            if content_start == -1:
+                return None
+            content_end = body.find(_SCRIPT_CLOSE, content_start)
+            if content_end == -1:
+                return None
+            try:
+                data = _loads(body[content_start + 1:content_end])
+            except ValueError as e:
+                logger.debug("__NEXT_DATA__ illisible: %s", e)
+                return None
+            return data if isinstance(data, dict) else None
+        pos = body.find(_MARKER, pos + len(_MARKER))
+
+    return None
@@ -1,27 +1,42 @@
 import logging
-from typing import Any, Dict, Optional
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
 
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
 
+from .compact_forest import CompactForest
 from .db_client import DatabaseClient
+from .model_store import (FINGERPRINT_COLUMNS, ModelStore, TRAINING_COLUMNS,
+                          add_age_days, dataset_fingerprint)
 from .models import Ad
+from .price_grid import PriceGrid
 from .scoring_config import SCORING_CONFIG
 from .search_manager import SearchManager
+from .vehicle_identity import IDENTITY_FEATURES, build_vocabulary, encode_identity, identity_frame
 
 logger = logging.getLogger(__name__)
 
+# Identifiant ModelStore du modèle poolé toutes recherches
+GLOBAL_MODEL_ID = "__global__"
+
+# Lignes comparées à sklearn pour valider l'export compact
+COMPACT_CHECK_ROWS = 64
+
 
 class PriceEngine:
-    def __init__(self, db_client: DatabaseClient):
+    def __init__(self, db_client: DatabaseClient | None, model_store: ModelStore | None = None):
         self.db = db_client
-
-        params = SCORING_CONFIG["price_engine"]["model_params"]
-        self.model = RandomForestRegressor(
-            n_estimators=int(params["n_estimators"]),
-            random_state=int(params["random_state"]),
-        )
+        self.store = model_store or ModelStore()
+
+        self.model: RandomForestRegressor | None = self._new_model()
+        # Forêt exportée en tableaux plats : prédictions 1 ligne (page Details Ads, rescan) ;
+        # les prédictions batch restent sur sklearn, plus rapide dès quelques centaines de lignes
+        self.compact: CompactForest | None = None
+        # Surface de prix précalculée (lookups O(1))
+        self.grid: PriceGrid | None = None
         self.is_trained = False
 
         # MÉMOIRE DU MODÈLE
@@ -30,17 +45,37 @@ class PriceEngine:
             "imputers": {},
         }
 
+    @staticmethod
+    def _new_model() -> RandomForestRegressor:
+        params = SCORING_CONFIG["price_engine"]["model_params"]
+        return RandomForestRegressor(
+            n_estimators=int(params["n_estimators"]),
+            random_state=int(params["random_state"]),
+        )
+
+    def get_market_frame(self, search_id: str, with_identity: bool = False) -> pd.DataFrame:
+        """Toutes les annonces de la recherche (1 lecture DB), servant au training ET au scoring."""
+        return pd.DataFrame(self.db.fetch_market_data(search_id, with_identity=with_identity))
+
     def get_data_for_search(self, search_id: str) -> pd.DataFrame:
         try:
-            rows = self.db.fetch_ads_for_price_training(search_id)
-            if not rows:
-                return pd.DataFrame()
+            return self.clean_training_frame(self.get_market_frame(search_id))
+        except Exception as e:
+            logger.exception(
+                "Erreur get_data_for_search(%s): %s", search_id, e)
+            return pd.DataFrame()
 
-            df = pd.DataFrame(rows)
-            if df.empty:
+    @staticmethod
+    def clean_training_frame(market: pd.DataFrame, keep_columns: Sequence[str] = ()) -> pd.DataFrame:
+        """
+        Applique veto + outliers au frame marché et renvoie le dataset d'entraînement
+        (+ keep_columns, ex. identité véhicule pour le modèle global).
+        """
+        try:
+            if market.empty:
                 return pd.DataFrame()
 
-            df = df.dropna(subset=["price", "year", "mileage"])
+            df = market.dropna(subset=["price", "year", "mileage"])
 
             veto = SCORING_CONFIG["price_engine"].get("veto", {})
             min_k = float(veto.get("min_k_arnaque_for_market", 0.5))
@@ -90,16 +125,21 @@ class PriceEngine:
             if df.empty:
                 return pd.DataFrame()
 
-            return df[["price", "year", "mileage", "horsepower"]].copy()
+            return df[[c for c in [*TRAINING_COLUMNS, *keep_columns] if c in df.columns]].copy()
 
         except Exception as e:
-            logger.exception(
-                "Erreur get_data_for_search(%s): %s", search_id, e)
+            logger.exception("Erreur clean_training_frame: %s", e)
             return pd.DataFrame()
 
-    def train(self, search_id: str, df: pd.DataFrame) -> None:
+    def train(self, search_id: str, df: pd.DataFrame, extra_features: Sequence[str] = (),
+              min_samples: int | None = None, extra_meta: Dict[str, Any] | None = None) -> None:
+        """
+        extra_features : features toujours retenues en plus de year/mileage/dynamiques
+        (codes d'identité du modèle global) ; extra_meta : persisté dans model_meta.
+        """
         training_cfg = SCORING_CONFIG["price_engine"].get("training", {})
-        min_samples = int(training_cfg.get("min_samples", 30))
+        if min_samples is None:
+            min_samples = int(training_cfg.get("min_samples", 30))
 
         if df is None or df.empty or len(df) < min_samples:
             logger.warning(
@@ -109,9 +149,34 @@ class PriceEngine:
                 search_id,
             )
             self.is_trained = False
-            SearchManager.update_model_meta(search_id, {"r2_score": "N/A"})
+            SearchManager.update_model_meta(search_id, {"r2_score": "N/A", "market_price": None})
             return
 
+        # Prix de référence du marché (triage pré-LLM du run suivant, sans relire la DB)
+        market_price = self.reference_price(df)
+
+        # Ordre canonique : empreinte stable ET entraînement déterministe
+        # (l'ordre de lecture SQL n'est pas garanti) ; tri sur les colonnes hachées uniquement
+        df = add_age_days(df)
+        sort_cols = [c for c in [*FINGERPRINT_COLUMNS, *extra_features] if c in df.columns]
+        df = df.sort_values(sort_cols, na_position="last").reset_index(drop=True)
+        df = self.bound_training_frame(df)
+        fingerprint = dataset_fingerprint(df, extra_columns=extra_features)
+
+        cached = self.store.load(search_id, fingerprint)
+        # Bundle sans modèle sklearn (ancien format compact seul) : ré-entraîné pour les batchs
+        if cached and cached.get("model") is not None and self._load_bundle(cached):
+            logger.info(
+                "Modèle rechargé (dataset inchangé) [search=%s] features=%s",
+                search_id, self.model_meta["features_used"])
+            SearchManager.update_model_meta(search_id, {"market_price": market_price})
+            return
+
+        self.model = self._new_model()
+        self.compact = None
+        self.grid = None
+        self.model_meta = {"features_used": [], "imputers": {}, **(extra_meta or {})}
+
         # 1) FEATURES OBLIGATOIRES
         base_features = ["year", "mileage"]
         final_features = base_features.copy()
@@ -132,143 +197,433 @@ class PriceEngine:
                     logger.info(
                         "Feature rejetée: %s (fill_rate=%.0f%%)", col, fill_rate * 100)
 
+        final_features.extend(f for f in extra_features if f in df.columns)
         self.model_meta["features_used"] = final_features
 
         # 3) ENTRAÎNEMENT
         X = df[final_features]
         y = df["price"]
 
-        self.model.fit(X, y)
+        weights = self.sample_weights(df)
+        self.model.fit(X, y, sample_weight=weights)
         self.is_trained = True
 
         # Score R² (sur train, conforme à ton implémentation)
-        score = float(self.model.score(X, y))
+        score = float(self.model.score(X, y, sample_weight=weights))
         logger.info(
             "Modèle entraîné [search=%s] features=%s R²=%.2f", search_id, final_features, score)
         SearchManager.update_model_meta(
-            search_id, {"r2_score": round(score, 2)})
+            search_id, {"r2_score": round(score, 2), "market_price": market_price})
 
-    def predict_price(self, year: int, km: int, hp: int | None = None) -> Optional[float]:
-        if not self.is_trained:
+        bundle = {
+            "fingerprint": fingerprint,
+            "model": self.model,
+            "model_meta": self.model_meta,
+            "r2_score": round(score, 2),
+        }
+        # Export compact vérifié contre sklearn sur un échantillon (pas de 2e prédiction du dataset)
+        compact = CompactForest.from_sklearn(self.model)
+        if compact.matches(self.model, X.sample(n=min(len(X), COMPACT_CHECK_ROWS), random_state=0)):
+            self.compact = compact
+            bundle["compact"] = compact
+        else:
+            logger.warning(
+                "Export compact divergent de sklearn, non utilisé [search=%s].", search_id)
+
+        # Surface year x km (x ch) : sans objet si d'autres features (identité) entrent en jeu
+        self.grid = None if extra_features else self._build_grid(df)
+        bundle["grid"] = self.grid
+        self.store.save(search_id, bundle)
+
+    @staticmethod
+    def reference_price(df: pd.DataFrame) -> float:
+        """Médiane (ou moyenne, selon veto.price_floor_stat) des prix du dataset d'entraînement."""
+        stat = str(SCORING_CONFIG["price_engine"].get("veto", {}).get(
+            "price_floor_stat", "median")).lower()
+        return round(float(df["price"].mean() if stat == "mean" else df["price"].median()), 2)
+
+    @staticmethod
+    def bound_training_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Plafonne le dataset à training.max_samples lignes : échantillonnage stratifié
+        par tranches d'années (allocation proportionnelle au plus fort reste, >= 1 ligne
+        par tranche tant que le plafond le permet), reproductible (df trié de façon
+        canonique + random_state fixe). Le résultat ne dépasse jamais max_samples.
+        """
+        training_cfg = SCORING_CONFIG["price_engine"].get("training", {})
+        max_samples = int(training_cfg.get("max_samples", 0) or 0)
+        if max_samples <= 0 or len(df) <= max_samples:
+            return df
+
+        band_width = max(1, int(training_cfg.get("year_band", 3)))
+        seed = int(training_cfg.get("sampling_random_state", 42))
+        bands = (df["year"] // band_width).astype(int)
+        exact = bands.value_counts().sort_index() * max_samples / len(df)
+        quotas = np.floor(exact).astype(int)
+        remainders = (exact - quotas).sort_values(ascending=False, kind="stable")
+        quotas[remainders.index[:max_samples - int(quotas.sum())]] += 1
+        # Tranches vides : 1 ligne prise sur la plus grosse tranche (total inchangé)
+        for band in quotas.index[quotas == 0]:
+            donor = quotas.idxmax()
+            if quotas[donor] <= 1:
+                break
+            quotas[donor] -= 1
+            quotas[band] = 1
+
+        sampled = [
+            group.sample(n=min(len(group), int(quotas[band])), random_state=seed)
+            for band, group in df.groupby(bands)
+        ]
+        bounded = pd.concat(sampled).sort_index()
+        logger.info(
+            "Dataset borné : %s -> %s lignes (%s tranches de %s ans).",
+            len(df), len(bounded), len(quotas), band_width)
+        return bounded.reset_index(drop=True)
+
+    @staticmethod
+    def sample_weights(df: pd.DataFrame) -> np.ndarray | None:
+        """
+        Poids de décroissance temporelle : 0.5 ** (ancienneté / demi-vie).
+        L'ancienneté est age_days (jours entiers, cf. add_age_days), la colonne hachée
+        dans l'empreinte : les poids sont entièrement déterminés par le dataset haché.
+        """
+        half_life = float(SCORING_CONFIG["price_engine"].get(
+            "training", {}).get("decay_half_life_days", 0) or 0)
+        if half_life <= 0 or "age_days" not in df.columns or df["age_days"].isna().all():
             return None
 
+        age_days = df["age_days"].to_numpy(dtype=float)
+        # date inconnue => traitée comme récente
+        age_days = np.nan_to_num(age_days, nan=0.0)
+        return np.power(0.5, age_days / half_life)
+
+    def _build_grid(self, df: pd.DataFrame) -> PriceGrid | None:
+        """Surface de prix sur la plage observée du dataset d'entraînement (1 prédiction batch)."""
+        grid_cfg = SCORING_CONFIG["price_engine"].get("grid", {})
         try:
-            input_data: Dict[str, Any] = {"year": year, "mileage": km}
+            return PriceGrid.build(
+                df, self.predict_prices,
+                mileage_steps=int(grid_cfg.get("mileage_steps", 40)),
+                hp_steps=int(grid_cfg.get("horsepower_steps", 5)),
+                use_hp="horsepower" in self.model_meta["features_used"],
+                default_hp=self.model_meta["imputers"].get("horsepower"),
+            )
+        except Exception as e:
+            logger.exception("Erreur construction surface de prix: %s", e)
+            return None
 
-            for col in self.model_meta["features_used"]:
-                if col in ("year", "mileage"):
-                    continue
+    def _load_bundle(self, bundle: Dict[str, Any]) -> bool:
+        """Charge un bundle ModelStore (forêt compacte et/ou modèle sklearn complet)."""
+        if bundle.get("compact") is None and bundle.get("model") is None:
+            return False
+        self.compact = bundle.get("compact")
+        self.model = bundle.get("model")
+        self.grid = bundle.get("grid")
+        self.model_meta = bundle["model_meta"]
+        self.is_trained = True
+        return True
+
+    def load_model(self, search_id: str) -> bool:
+        """
+        Recharge le dernier modèle persisté d'une recherche, sans lecture DB ni ré-entraînement
+        (estimations ponctuelles : page Details Ads, rescan).
+        """
+        bundle = self.store.load(search_id)
+        if not bundle or not self._load_bundle(bundle):
+            self.is_trained = False
+            return False
+        return True
+
+    def _feature_matrix(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Matrice de features (colonnes = features_used) pour N annonces,
+        imputation des features dynamiques manquantes en une passe.
+        """
+        X = pd.DataFrame(index=df.index)
+        for col in self.model_meta["features_used"]:
+            values = pd.to_numeric(df[col], errors="coerce") if col in df.columns else pd.Series(
+                np.nan, index=df.index)
+            if col in self.model_meta["imputers"]:
+                values = values.fillna(self.model_meta["imputers"][col])
+            X[col] = values
+        return X
+
+    def predict_prices(self, df: pd.DataFrame) -> Optional[np.ndarray]:
+        """Prédiction batch : un seul appel predict() pour toutes les lignes de df."""
+        if not self.is_trained or df.empty:
+            return None
+        X = self._feature_matrix(df)
+        if self.model is not None:
+            predicted = self.model.predict(X)
+        else:
+            predicted = self.compact.predict(X.to_numpy(dtype=float))
+        return np.round(predicted.astype(float), 2)
 
-                if col == "horsepower":
-                    input_data[col] = hp if hp is not None else self.model_meta["imputers"].get(
-                        col, 0)
+    def predict_price(self, year: int, km: int, hp: int | None = None) -> Optional[float]:
+        if not self.is_trained:
+            return None
 
-            features_df = pd.DataFrame([input_data])[
-                self.model_meta["features_used"]]
-            predicted = float(self.model.predict(features_df)[0])
-            return round(predicted, 2)
+        try:
+            if self.compact is not None:
+                # Chemin rapide : ni DataFrame ni validation sklearn pour une seule ligne
+                raw = {"year": year, "mileage": km, "horsepower": hp}
+                x = []
+                for col in self.model_meta["features_used"]:
+                    value = raw.get(col)
+                    if value is None or value != value:
+                        value = self.model_meta["imputers"].get(col, np.nan)
+                    x.append(value)
+                return round(self.compact.predict_one(x), 2)
+
+            row = pd.DataFrame(
+                [{"year": year, "mileage": km, "horsepower": hp}])
+            return float(self.predict_prices(row)[0])
 
         except Exception as e:
             logger.exception("Erreur predict_price: %s", e)
             return None
 
+    def fair_price(self, year: int, km: int, hp: int | None = None) -> Optional[float]:
+        """
+        Prix juste en O(1) via la surface précalculée (interpolation) ;
+        repli sur le modèle si la surface n'est pas disponible.
+        """
+        if self.grid is not None:
+            return self.grid.lookup(year, km, hp)
+        return self.predict_price(year, km, hp)
+
     @staticmethod
-    def _deal_score_from_ratio(ratio: float) -> float:
+    def _deal_scores_from_ratios(ratios: np.ndarray) -> np.ndarray:
+        """
+        S_Deal (0-100) depuis ratio = prix / prix juste, linéaire par morceaux :
+        <= good_deal_ratio -> 100, neutral_ratio -> 50, >= bad_deal_ratio -> 0.
+        """
         cfg = SCORING_CONFIG["price_engine"]["scoring"]
 
         r_good = float(cfg["good_deal_ratio"])
         r_neutral = float(cfg.get("neutral_ratio", 1.0))
         r_bad = float(cfg["bad_deal_ratio"])
 
-        if ratio <= r_good:
-            return 100.0
-        if ratio >= r_bad:
-            return 0.0
-
-        if ratio <= r_neutral:
-            # 100 → 50
-            return 50.0 + (r_neutral - ratio) * (50.0 / (r_neutral - r_good))
-        else:
-            # 50 → 0
-            return 50.0 - (ratio - r_neutral) * (50.0 / (r_bad - r_neutral))
-
-    def update_deal_scores(self, search_id: str) -> None:
-        logger.info("Audit du marché [search=%s]...", search_id)
-
-        df = self.get_data_for_search(search_id)
+        up = 50.0 + (r_neutral - ratios) * (50.0 / (r_neutral - r_good))
+        down = 50.0 - (ratios - r_neutral) * (50.0 / (r_bad - r_neutral))
+
+        scores = np.where(ratios <= r_neutral, up, down)
+        scores = np.where(ratios >= r_bad, 0.0, scores)
+        scores = np.where(ratios <= r_good, 100.0, scores)
+        return np.clip(scores, 0.0, 100.0)
+
+    def compute_deal_updates(self, active: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        Scoring batch des annonces actives d'une recherche (frame colonnaire de fetch_market_data) :
+        1 matrice de features, 1 appel predict(), ratios / S_Deal / total en NumPy.
+        Retourne des patchs partiels [{"id": ..., "scores": {...}}, ...] pour bulk_update_scores.
+        """
+        if active.empty or not self.is_trained:
+            return []
+        active = active[(active["year"].fillna(0) != 0) & (
+            active["mileage"].fillna(0) != 0)]
+        if active.empty:
+            return []
+
+        fair_prices = self.predict_prices(active)
+
+        # prix virtuel = prix + frais chiffrables IA
+        prices = active["price"].fillna(0).to_numpy(dtype=float)
+        repair_costs = active["repair_cost"].fillna(0).to_numpy(dtype=float)
+        virtual_prices = prices + repair_costs
+
+        valid = fair_prices > 0
+        ratios = np.divide(virtual_prices, fair_prices,
+                           out=np.ones_like(virtual_prices), where=valid)
+        s_deals = self._deal_scores_from_ratios(ratios)
+
+        # Recalcul total
+        s_conf = active["conf"].fillna(50).to_numpy(dtype=float)
+        s_prod = active["prod"].fillna(0).to_numpy(dtype=float)
+        k_meca = active["k_meca"].fillna(1.0).to_numpy(dtype=float)
+        k_modif = active["k_modif"].fillna(1.0).to_numpy(dtype=float)
+        k_arnaque = active["k_arnaque"].fillna(1.0).to_numpy(dtype=float)
+        weights = SCORING_CONFIG["weights"]
+        totals = ((s_deals * weights["deal"]) + (s_conf * weights["conf"])
+                  + (s_prod * weights["prod"])) * k_meca * k_modif * k_arnaque
+
+        # Dirty-tracking : on ne garde que les lignes dont une valeur change au-delà de la tolérance
+        new_values = {
+            "deal": np.round(s_deals),
+            "market_estimation": np.round(fair_prices),
+            "virtual_price": np.trunc(virtual_prices),
+            "total": np.round(totals, 1),
+        }
+        tolerance = SCORING_CONFIG["price_engine"].get("update_tolerance", {})
+        dirty = np.zeros(len(active), dtype=bool)
+        for key, values in new_values.items():
+            stored = active[f"cur_{key}"].to_numpy(dtype=float)
+            # NaN (valeur absente) => toujours à écrire
+            dirty |= ~(np.abs(values - stored) <= float(tolerance.get(key, 0)))
+        to_write = valid & dirty
+
+        skipped = int((valid & ~dirty).sum())
+        if skipped:
+            logger.info(
+                "Dirty-tracking: %s/%s cotes inchangées, non réécrites.", skipped, int(valid.sum()))
+
+        ids = active["id"].to_numpy()
+        updates = []
+        for i in np.flatnonzero(to_write):
+            updates.append({"id": ids[i], "scores": {
+                "base": {"deal": int(round(float(s_deals[i])))},
+                "financial": {
+                    "market_estimation": int(round(float(fair_prices[i]))),
+                    "virtual_price": int(virtual_prices[i]),
+                },
+                "total": round(float(totals[i]), 1),
+            }})
+        return updates
+
+    def analyse_search(self, search_id: str, df: pd.DataFrame, active: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        Entraîne (ou recharge) le modèle d'une recherche puis score ses annonces actives.
+        Sans accès DB : utilisable tel quel dans un process du pool.
+        """
         if df.empty:
             logger.warning(
                 "Dataset marché vide après veto/outliers [search=%s].", search_id)
             self.is_trained = False
             SearchManager.update_model_meta(search_id, {"r2_score": "N/A"})
-            return
+            return []
 
         self.train(search_id, df)
         if not self.is_trained:
             logger.warning(
                 "Modèle non entraîné, deal scores non mis à jour [search=%s].", search_id)
-            return
+            return []
+
+        return self.compute_deal_updates(active)
+
+    def train_global(self, markets: List[pd.DataFrame]) -> bool:
+        """
+        Modèle poolé sur les annonces propres de toutes les recherches (dédoublonnées),
+        avec marque / modèle / génération normalisés en features.
+        Dataset insuffisant => repli sur le dernier modèle global persisté.
+        """
+        cfg = SCORING_CONFIG["price_engine"].get("global_model", {})
+        frames = [self.clean_training_frame(m, keep_columns=["id", "title", "brand", "model"])
+                  for m in markets if not m.empty]
+        frames = [f for f in frames if not f.empty]
+
+        if frames:
+            pooled = pd.concat(frames, ignore_index=True).drop_duplicates("id")
+            vocabulary = build_vocabulary(identity_frame(pooled))
+            pooled = encode_identity(pooled, vocabulary)
+            pooled = pooled[[c for c in [*TRAINING_COLUMNS, *IDENTITY_FEATURES] if c in pooled.columns]]
+            self.train(GLOBAL_MODEL_ID, pooled, extra_features=IDENTITY_FEATURES,
+                       min_samples=int(cfg.get("min_samples", 100)),
+                       extra_meta={"vocabulary": vocabulary})
+            if self.is_trained:
+                return True
+
+        if self.load_model(GLOBAL_MODEL_ID) and "vocabulary" in self.model_meta:
+            logger.info("Modèle global : dernier modèle persisté réutilisé.")
+            return True
+        return False
+
+    def _score_with_global_model(self, markets: List[pd.DataFrame], cold_jobs: List[tuple]) -> List[Dict[str, Any]]:
+        """Scoring des recherches "cold start" (dataset < training.min_samples) via le modèle global."""
+        engine = PriceEngine(db_client=None, model_store=self.store)
+        if not engine.train_global(markets):
+            logger.warning(
+                "Modèle global indisponible : %s recherches sans cote marché.", len(cold_jobs))
+            for search_id, _, _ in cold_jobs:
+                SearchManager.update_model_meta(search_id, {"r2_score": "N/A"})
+            return []
+
+        vocabulary = engine.model_meta["vocabulary"]
+        updates: List[Dict[str, Any]] = []
+        for search_id, _, active in cold_jobs:
+            try:
+                updates.extend(engine.compute_deal_updates(
+                    encode_identity(active, vocabulary)))
+                SearchManager.update_model_meta(
+                    search_id, {"r2_score": "N/A (global)"})
+            except Exception as e:
+                logger.exception(
+                    "Erreur scoring modèle global (%s): %s", search_id, e)
+        logger.info("Modèle global : %s recherches en repli.", len(cold_jobs))
+        return updates
 
+    def update_deal_scores(self, search_id: str) -> None:
+        """Market update d'UNE recherche (rescan manuel)."""
+        self.update_all_deal_scores([search_id], processes=1)
+
+    def update_all_deal_scores(self, search_ids: List[str], processes: int = 1) -> None:
+        """
+        Etape "market analysis" du worker, après scraping + sauvegarde de toutes les recherches :
+          1) lecture DB (process principal) des datasets de chaque recherche
+          2) entraînement + scoring en parallèle (1 process par recherche, n_jobs=1 par forêt)
+          3) une seule écriture batch des scores
+        processes <= 0 => nombre de cœurs disponibles.
+        """
+        if not search_ids:
+            return
+        logger.info("Audit du marché sur %s recherches...", len(search_ids))
+        global_enabled = bool(SCORING_CONFIG["price_engine"].get("global_model", {}).get("enabled", False))
+
+        jobs = []
+        markets = []
+        for search_id in search_ids:
+            try:
+                market = self.get_market_frame(search_id, with_identity=global_enabled)
+                df = self.clean_training_frame(market)
+                active = market[market["status"] ==
+                                "ACTIVE"] if not market.empty else market
+                jobs.append((search_id, df, active))
+                markets.append(market)
+            except Exception as e:
+                logger.exception(
+                    "Erreur lecture marché (%s): %s", search_id, e)
+
+        # Recherches trop petites : repli sur le modèle global (1 seul entraînement poolé)
+        results: List[List[Dict[str, Any]]] = []
+        if global_enabled:
+            min_samples = int(SCORING_CONFIG["price_engine"].get(
+                "training", {}).get("min_samples", 30))
+            cold_jobs = [job for job in jobs if len(job[1]) < min_samples]
+            jobs = [job for job in jobs if len(job[1]) >= min_samples]
+            if cold_jobs:
+                results.append(self._score_with_global_model(markets, cold_jobs))
+
+        processes = processes if processes > 0 else (os.cpu_count() or 1)
+        processes = max(1, min(processes, len(jobs)))
+
+        if processes == 1:
+            for search_id, df, active in jobs:
+                try:
+                    results.append(self.analyse_search(search_id, df, active))
+                except Exception as e:
+                    logger.exception(
+                        "Erreur update_deal_scores(%s): %s", search_id, e)
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                futures = [pool.submit(_analyse_search_job, *job)
+                           for job in jobs]
+                for (search_id, _, _), future in zip(jobs, futures):
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        logger.exception(
+                            "Erreur update_deal_scores(%s): %s", search_id, e)
+
+        # Repli global d'abord, puis recherches dans l'ordre : pour une annonce partagée, la dernière gagne
+        updates = [upd for search_updates in results for upd in search_updates]
         try:
-            ads = self.db.fetch_active_ads_for_deal_update(search_id)
-            updates = []
-
-            for ad in ads:
-                year = ad.get("year")
-                mileage = ad.get("mileage")
-                if not year or not mileage:
-                    continue
-
-                fair_price = self.predict_price(
-                    year, mileage, ad.get("horsepower"))
-                if not fair_price or fair_price <= 0:
-                    continue
-
-                # prix virtuel
-                repair_cost = 0
-                ai_analysis = ad.get("ai_analysis") or {}
-                for frais in ai_analysis.get("frais_chiffrables", []):
-                    repair_cost += int(frais.get("cout") or 0)
-
-                price = int(ad.get("price") or 0)
-                virtual_price = price + repair_cost
-
-                ratio = virtual_price / fair_price if fair_price > 0 else 1.0
-
-                s_deal = self._deal_score_from_ratio(ratio)
-                s_deal = max(0.0, min(100.0, s_deal))
-
-                current_scores = dict(ad.get("scores") or {})
-                current_scores.setdefault("base", {})
-                current_scores.setdefault("financial", {})
-
-                current_scores["base"]["deal"] = int(round(s_deal))
-                current_scores["financial"]["market_estimation"] = int(
-                    round(fair_price))
-                current_scores["financial"]["virtual_price"] = int(
-                    virtual_price)
-
-                # Recalcul total
-                s_conf = float(current_scores.get("base", {}).get("conf", 50))
-                s_prod = float(current_scores.get("base", {}).get("prod", 0))
-                weights = SCORING_CONFIG["weights"]
-
-                total = (s_deal * weights["deal"]) + (s_conf *
-                                                      weights["conf"]) + (s_prod * weights["prod"])
-
-                sanity = current_scores.get("sanity_checks", {})
-                k_meca = float(sanity.get("k_meca", 1.0))
-                k_modif = float(sanity.get("k_modif", 1.0))
-                k_arnaque = float(sanity.get("k_arnaque", 1.0))
-
-                current_scores["total"] = round(
-                    total * k_meca * k_modif * k_arnaque, 1)
-
-                updates.append({"id": ad["id"], "scores": current_scores})
-
             updated = self.db.bulk_update_scores(updates)
             logger.info(
-                "Market Update OK: %s cotes mises à jour [search=%s].", updated, search_id)
-
+                "Market Update OK: %s cotes mises à jour (%s recherches, %s process).",
+                updated, len(markets), processes)
         except Exception as e:
-            logger.exception("Erreur update_deal_scores(%s): %s", search_id, e)
+            logger.exception("Erreur écriture batch des scores: %s", e)
+
+
+def _analyse_search_job(search_id: str, df: pd.DataFrame, active: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Point d'entrée picklable pour le ProcessPoolExecutor (pas de DB dans les workers)."""
+    return PriceEngine(db_client=None).analyse_search(search_id, df, active)
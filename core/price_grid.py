@@ -0,0 +1,114 @@
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _locate(value: float, start: float, step: float, n: int) -> Tuple[int, float]:
+    """Index de la cellule + fraction dans la cellule, valeur bornée à l'axe (axes uniformes)."""
+    if n == 1 or step <= 0:
+        return 0, 0.0
+    pos = min(max((float(value) - start) / step, 0.0), float(n - 1))
+    i = min(int(pos), n - 2)
+    return i, pos - i
+
+
+@dataclass
+class PriceGrid:
+    """
+    Surface de prix "juste" précalculée après l'entraînement, sur la plage observée
+    de la recherche : années (pas de 1 an) x kilométrage (x puissance si feature retenue).
+    Les axes sont uniformes : lookup() = calcul d'index + interpolation (bi/tri)linéaire,
+    coût constant quel que soit le modèle.
+    """
+
+    year_start: float
+    year_step: float
+    mileage_start: float
+    mileage_step: float
+    hp_start: float
+    hp_step: float
+    values: np.ndarray   # (n_years, n_mileage, n_hp) ; n_hp = 1 sans puissance
+    default_hp: float    # puissance utilisée quand elle est inconnue (imputer)
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, predict: Callable[[pd.DataFrame], np.ndarray],
+              mileage_steps: int = 40, hp_steps: int = 5, use_hp: bool = False,
+              default_hp: float | None = None) -> Optional["PriceGrid"]:
+        """
+        df : dataset d'entraînement (plages observées) ;
+        predict : prédiction batch (PriceEngine.predict_prices), appelée une seule fois sur toute la grille.
+        """
+        if df.empty:
+            return None
+
+        y_min, y_max = int(df["year"].min()), int(df["year"].max())
+        years = np.arange(y_min, y_max + 1, dtype=float)
+        km_min, km_max = float(df["mileage"].min()), float(df["mileage"].max())
+        mileages = np.linspace(km_min, km_max, max(2, int(mileage_steps)))
+
+        hp_values = df["horsepower"].dropna() if use_hp and "horsepower" in df.columns else pd.Series(dtype=float)
+        if hp_values.empty:
+            hps = np.array([np.nan if default_hp is None else float(default_hp)])
+        else:
+            hps = np.linspace(float(hp_values.min()), float(hp_values.max()), max(2, int(hp_steps)))
+        if default_hp is None:
+            default_hp = float(hp_values.median()) if not hp_values.empty else float("nan")
+
+        mesh_y, mesh_k, mesh_h = np.meshgrid(years, mileages, hps, indexing="ij")
+        mesh = pd.DataFrame({
+            "year": mesh_y.ravel(),
+            "mileage": mesh_k.ravel(),
+            "horsepower": mesh_h.ravel(),
+        })
+        predicted = predict(mesh)
+        if predicted is None:
+            return None
+
+        def axis(values: np.ndarray) -> Tuple[float, float]:
+            return float(values[0]), float(values[1] - values[0]) if len(values) > 1 else 0.0
+
+        (year_start, year_step), (mileage_start, mileage_step), (hp_start, hp_step) = (
+            axis(years), axis(mileages), axis(hps))
+        return cls(
+            year_start=year_start, year_step=year_step,
+            mileage_start=mileage_start, mileage_step=mileage_step,
+            hp_start=hp_start, hp_step=hp_step,
+            values=np.asarray(predicted, dtype=float).reshape(mesh_y.shape),
+            default_hp=float(default_hp),
+        )
+
+    @property
+    def years(self) -> np.ndarray:
+        return self.year_start + self.year_step * np.arange(self.values.shape[0])
+
+    @property
+    def mileages(self) -> np.ndarray:
+        return self.mileage_start + self.mileage_step * np.arange(self.values.shape[1])
+
+    def lookup(self, year: float, mileage: float, hp: float | None = None) -> float:
+        """Prix juste interpolé, O(1). Hors plage observée : valeur du bord."""
+        n_y, n_k, n_h = self.values.shape
+        if hp is None or hp != hp:
+            hp = self.default_hp
+
+        iy, fy = _locate(year, self.year_start, self.year_step, n_y)
+        ik, fk = _locate(mileage, self.mileage_start, self.mileage_step, n_k)
+        ih, fh = _locate(hp, self.hp_start, self.hp_step, n_h) if hp == hp else (0, 0.0)
+
+        v = self.values
+        y1, k1, h1 = min(iy + 1, n_y - 1), min(ik + 1, n_k - 1), min(ih + 1, n_h - 1)
+        total = 0.0
+        for y, wy in ((iy, 1.0 - fy), (y1, fy)):
+            for k, wk in ((ik, 1.0 - fk), (k1, fk)):
+                for h, wh in ((ih, 1.0 - fh), (h1, fh)):
+                    w = wy * wk * wh
+                    if w:
+                        total += w * float(v[y, k, h])
+        return round(total, 2)
+
+    def curve(self, year: float, hp: float | None = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Courbe prix juste vs kilométrage pour une année (graphe marché)."""
+        mileages = self.mileages
+        return mileages, np.array([self.lookup(year, km, hp) for km in mileages])
@@ -0,0 +1,43 @@
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class HostRateLimiter:
+    """
+    Token bucket (capacité 1) thread-safe, partagé par hôte.
+
+    Chaque acquire() réserve le prochain créneau libre pour l'hôte puis attend
+    hors verrou. Le créneau suivant est espacé d'un intervalle tiré dans
+    [min_interval, max_interval] : on garde exactement le budget de politesse
+    des anciennes pauses random.uniform(), mais il est désormais GLOBAL à
+    tous les threads au lieu d'être appliqué par appel.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float):
+        self.min_interval = max(0.0, float(min_interval))
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self._lock = threading.Lock()
+        self._next_slot: dict[str, float] = {}
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return urlparse(url).netloc or url
+
+    def acquire(self, url: str, scale: float = 1.0) -> float:
+        """
+        Bloque jusqu'au créneau réservé. Retourne le temps d'attente (s).
+        scale étire/réduit l'intervalle suivant (cadence adaptative du scheduler).
+        """
+        host = self._host(url)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + scale * \
+                random.uniform(self.min_interval, self.max_interval)
+
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from .app_config import ScraperConfig, load_app_config
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "CLOSED"
+STATE_OPEN = "OPEN"
+
+# Réponses qui signalent qu'on tape trop fort
+BLOCK_STATUS = {403}
+THROTTLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Scraping suspendu : le disjoncteur est ouvert (blocage / surcharge détectés)."""
+
+
+class RequestScheduler:
+    """
+    Cadence adaptative + disjoncteur, partagés par TOUT le trafic vers LBC
+    (recherche, pages annonces, pings d'archivage, rescan).
+
+    - delay_factor multiplie les pauses configurées (SCRAPER_*_SLEEP) :
+      réponse saine -> x speedup_factor (borné par min_delay_factor, 1.0 par défaut :
+      jamais plus rapide que les pauses configurées),
+      429/5xx       -> x backoff_factor (borné par max_delay_factor).
+    - 403 (Datadome) ou N échecs 429/5xx consécutifs -> disjoncteur OUVERT :
+      toute requête lève CircuitOpenError jusqu'à la fin du cool-down.
+    L'état est persisté (SCRAPER_STATE_FILE) : le run suivant le respecte et
+    le dashboard peut l'afficher. Le fichier est relu par check() dès qu'il change
+    (disjoncteur ouvert par un autre process : worker <-> dashboard).
+    """
+
+    def __init__(self, cfg: ScraperConfig, state_file: Path):
+        self.cfg = cfg
+        self.state_file = Path(state_file)
+        self._lock = threading.Lock()
+
+        self.delay_factor = 1.0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.reason: str | None = None
+        self._persisted_open = False
+        self._state_mtime: float | None = None
+        self._load_state()
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+    def _file_mtime(self) -> float | None:
+        try:
+            return self.state_file.stat().st_mtime
+        except OSError:
+            return None
+
+    def _load_state(self) -> None:
+        self._state_mtime = self._file_mtime()
+        raw = _read_raw_state(self.state_file)
+        if self._adopt(raw):
+            logger.warning(
+                "⛔ Disjoncteur scraping toujours ouvert (%s) jusqu'à %s",
+                self.reason, datetime.fromtimestamp(self.open_until).strftime("%H:%M:%S"))
+        elif raw.get("state") == STATE_OPEN:
+            # Cool-down expiré depuis le dernier run : on le referme aussi sur disque
+            self._save_state()
+
+    def _adopt(self, raw: dict) -> bool:
+        """Reprend un disjoncteur OUVERT (non expiré) lu sur disque. True si adopté."""
+        open_until = float(raw.get("open_until") or 0)
+        if raw.get("state") != STATE_OPEN or open_until <= max(time.time(), self.open_until):
+            return False
+        self.open_until = open_until
+        self.reason = raw.get("reason")
+        self.delay_factor = float(raw.get("delay_factor", self.delay_factor))
+        self._persisted_open = True
+        return True
+
+    def _refresh(self) -> None:
+        """Relit le fichier d'état s'il a changé ; persiste la fermeture à l'expiration."""
+        with self._lock:
+            mtime = self._file_mtime()
+            if mtime is not None and mtime != self._state_mtime:
+                self._state_mtime = mtime
+                if self._adopt(_read_raw_state(self.state_file)):
+                    logger.warning(
+                        "⛔ Disjoncteur ouvert par un autre process (%s).", self.reason)
+            if self._persisted_open and not self.is_open():
+                logger.info("✅ Disjoncteur refermé (fin du cool-down).")
+                self._save_state()
+
+    def _save_state(self) -> None:
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_file.with_suffix(f".{os.getpid()}.tmp")
+            snapshot = self.snapshot()
+            tmp.write_text(json.dumps(snapshot), encoding="utf-8")
+            os.replace(tmp, self.state_file)
+            self._persisted_open = snapshot["state"] == STATE_OPEN
+            self._state_mtime = self._file_mtime()
+        except Exception:
+            logger.exception("Impossible d'écrire l'état du scheduler")
+
+    def snapshot(self) -> dict:
+        is_open = self.open_until > time.time()
+        return {
+            "state": STATE_OPEN if is_open else STATE_CLOSED,
+            "open_until": self.open_until if is_open else None,
+            "reason": self.reason if is_open else None,
+            "delay_factor": round(self.delay_factor, 3),
+            "consecutive_failures": self.consecutive_failures,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+
+    # ------------------------------------------------------------------
+    # Disjoncteur
+    # ------------------------------------------------------------------
+    def is_open(self) -> bool:
+        return self.open_until > time.time()
+
+    def check(self) -> None:
+        """À appeler avant chaque requête : lève CircuitOpenError si suspendu."""
+        self._refresh()
+        if self.is_open():
+            remaining = int(self.open_until - time.time())
+            raise CircuitOpenError(
+                f"Scraping suspendu ({self.reason}), reprise dans {remaining}s")
+
+    def _open(self, reason: str) -> None:
+        self.open_until = time.time() + self.cfg.breaker_cooldown_seconds
+        self.reason = reason
+        self.delay_factor = self.cfg.max_delay_factor
+        logger.error(
+            "⛔ Disjoncteur OUVERT (%s) : scraping suspendu %.0fs.",
+            reason, self.cfg.breaker_cooldown_seconds)
+
+    # ------------------------------------------------------------------
+    # Cadence
+    # ------------------------------------------------------------------
+    def record(self, status_code: int | None) -> None:
+        """Met à jour la cadence selon la réponse (None = erreur réseau/timeout)."""
+        with self._lock:
+            previous_factor = self.delay_factor
+
+            if status_code in BLOCK_STATUS:
+                self.consecutive_failures += 1
+                self._open(f"HTTP {status_code}")
+            elif status_code is None or status_code in THROTTLE_STATUS:
+                self.consecutive_failures += 1
+                self.delay_factor = min(
+                    self.cfg.max_delay_factor, self.delay_factor * self.cfg.backoff_factor)
+                logger.warning(
+                    "🐢 Backoff (%s) : facteur de pause x%.2f (%s échecs consécutifs)",
+                    status_code or "erreur réseau", self.delay_factor, self.consecutive_failures)
+                if self.consecutive_failures >= self.cfg.breaker_failure_threshold:
+                    self._open(
+                        f"{self.consecutive_failures} échecs consécutifs ({status_code or 'réseau'})")
+            else:
+                self.consecutive_failures = 0
+                self.delay_factor = max(
+                    self.cfg.min_delay_factor, self.delay_factor * self.cfg.speedup_factor)
+
+            if self.is_open() != self._persisted_open or abs(self.delay_factor - previous_factor) > 1e-9:
+                self._save_state()
+
+    def pause(self, min_seconds: float, max_seconds: float) -> float:
+        """Pause de politesse adaptée à la santé courante. Retourne la durée dormie."""
+        self.check()
+        sleep_time = random.uniform(min_seconds, max_seconds) * self.delay_factor
+        time.sleep(sleep_time)
+        return sleep_time
+
+
+def _read_raw_state(state_file: Path) -> dict:
+    try:
+        return json.loads(Path(state_file).read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def read_state(state_file: Path) -> dict:
+    """
+    Lecture seule de l'état persisté (utilisée aussi par le dashboard) ;
+    un OPEN dont le cool-down est expiré est rapporté CLOSED.
+    """
+    state = _read_raw_state(state_file)
+    if state.get("state") == STATE_OPEN and float(state.get("open_until") or 0) <= time.time():
+        state.update(state=STATE_CLOSED, open_until=None, reason=None)
+    return state
+
+
+_SCHEDULER: RequestScheduler | None = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        with _SCHEDULER_LOCK:
+            if _SCHEDULER is None:
+                cfg = load_app_config()
+                _SCHEDULER = RequestScheduler(
+                    cfg.scraper, cfg.paths.scraper_state_file)
+    return _SCHEDULER
@@ -1,20 +1,19 @@
 import logging
 from datetime import datetime
-import requests
 
 from core.db_client import DatabaseClient
 from core.scraper import LBCScraper
 from core.ai_analyst import AIAnalyst
 from core.price_engine import PriceEngine
-from core import config
+from core import http_client
+from core.request_scheduler import CircuitOpenError
 
 logger = logging.getLogger(__name__)
 
 
 def _is_ad_alive(url: str) -> bool:
     """Check rapide, cohérent avec archive_old_ads()."""
-    headers = config.get_random_headers()
-    r = requests.head(url, headers=headers, timeout=5, allow_redirects=True)
+    r = http_client.head(url, allow_redirects=True)
     return r.status_code == 200
 
 
@@ -40,6 +39,9 @@ def rescan_ad(ad_id: str) -> dict:
 
     try:
         alive = _is_ad_alive(url)
+    except CircuitOpenError as e:
+        logger.warning("⛔ Re-scan refusé: %s", e)
+        return {"ok": False, "reason": "CIRCUIT_OPEN"}
     except Exception:
         logger.exception("⚠️ Re-scan: erreur check alive")
         return {"ok": False, "reason": "ALIVE_CHECK_ERROR"}
@@ -89,9 +89,39 @@ SCORING_CONFIG = {
             "neutral_ratio": 1.0,     # => 50
             "bad_deal_ratio": 1.5     # => 0
         },
+        # Dirty-tracking : on ne réécrit scores que si une valeur bouge au-delà de ces écarts
+        "update_tolerance": {
+            "deal": 0,                # points (entier)
+            "market_estimation": 10,  # €
+            "virtual_price": 0,       # €
+            "total": 0.1              # points
+        },
+        # Surface de prix précalculée (années x km x ch) pour les lookups O(1) (UI, graphe marché)
+        "grid": {
+            "mileage_steps": 40,    # points sur l'axe kilométrage
+            "horsepower_steps": 5   # points sur l'axe puissance (si feature retenue)
+        },
         "training": {
             # (choix v1) >10 pour éviter l'instabilité, <50 pour ne pas bloquer trop souvent
             "min_samples": 15,
+            # Fenêtre d'entraînement bornée (grosses recherches historiques)
+            "max_samples": 3000,            # au-delà : échantillonnage stratifié par tranches d'années
+            "year_band": 3,                 # largeur d'une tranche (années)
+            "sampling_random_state": 42,    # échantillon reproductible (empreinte / cache modèle)
+            # Poids = 0.5 ** (ancienneté / demi-vie), ancienneté mesurée depuis l'annonce la plus récente
+            "decay_half_life_days": 180,    # 0 = pas de décroissance
+        },
+        # Modèle global (toutes recherches poolées) : repli des recherches sous training.min_samples
+        "global_model": {
+            "enabled": False,
+            "min_samples": 100,  # taille minimale du dataset poolé
+            # Génération déduite du titre normalisé (1er motif trouvé, groupe 1, espaces retirés)
+            "generation_patterns": [
+                r"\b(n[a-d])\b",          # Mazda MX-5 NA/NB/NC/ND
+                r"\b(mk ?[1-9])\b",       # MK2, mk 3...
+                r"\b(phase ?[1-3])\b",    # Phase 1/2/3
+                r"\b([efg][0-9]{2})\b",   # châssis BMW E36, F30...
+            ],
         },
         "veto": {
             "min_k_arnaque_for_market": 0.5,
@@ -127,5 +157,18 @@ SCORING_CONFIG = {
             "sum_cap": 0.40,  # quelques signaux s'additionnent mais cap vite
             "k_min": 0.05,   # un gros signal peut quasiment tuer le score
         },
-    }
+    },
+
+    # Triage pré-LLM (entre process_ads et le deep scraping) : règles bon marché
+    # réutilisant price_engine.veto / outliers + prix de marché de la recherche
+    "triage": {
+        "enabled": True,
+        # Action par famille de règle (junk:<mot>, outlier:<borne>, price_floor) :
+        # skip = ni deep scraping ni IA ; flag = analysée quand même (suspicion d'arnaque).
+        # Dans les deux cas la règle est conservée dans scores.triage.
+        "actions": {"junk": "skip", "outlier": "skip", "price_floor": "flag"},
+        # Titres hors sujet (pièces détachées, location...) ; mots entiers, titre en minuscules
+        "junk_keywords": ["pour pieces", "pour pièces", "pièces détachées", "pieces detachees",
+                          "location", "à louer", "a louer", "épave", "epave", "moteur seul"],
+    },
 }
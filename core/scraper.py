@@ -1,66 +1,119 @@
-import requests
-import json
 from bs4 import BeautifulSoup
 import time
-import random
-from . import config
+from . import config, fixtures, http_cache
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from typing import Any, Callable
 from .app_config import load_app_config
+from .keyword_filter import get_matcher
+from .next_data import extract_next_data
+from .rate_limiter import HostRateLimiter
+from .request_scheduler import CircuitOpenError, get_scheduler
 
 
 logger = logging.getLogger(__name__)
 
+# Limiteur partagé par tous les threads de deep scraping (pages annonces)
+_AD_PAGE_LIMITER: HostRateLimiter | None = None
+
+
+def _ad_page_limiter() -> HostRateLimiter:
+    global _AD_PAGE_LIMITER
+    if _AD_PAGE_LIMITER is None:
+        cfg = load_app_config().scraper
+        _AD_PAGE_LIMITER = HostRateLimiter(
+            cfg.ad_page_min_sleep_seconds, cfg.ad_page_max_sleep_seconds)
+    return _AD_PAGE_LIMITER
+
 
 class LBCScraper:
     @staticmethod
-    def fetch_html(lbc_params: dict) -> str | None:
-        """Fait la requête HTTP de recherche."""
+    def fetch_html(lbc_params: dict, page: int = 1) -> bytes | None:
+        """Fait la requête HTTP de recherche (corps brut, non décodé)."""
         try:
             cfg = load_app_config().scraper
-            sleep_time = random.uniform(
-                cfg.min_sleep_seconds, cfg.max_sleep_seconds)
-            logger.info(f"   💤 Pause sécu de {sleep_time:.2f}s...")
-            time.sleep(sleep_time)
 
-            headers = config.get_random_headers()
+            params = dict(lbc_params)
+            if page > 1:
+                params["page"] = page
+
+            def pause():
+                sleep_time = get_scheduler().pause(
+                    cfg.min_sleep_seconds, cfg.max_sleep_seconds)
+                logger.info(f"   💤 Pause sécu de {sleep_time:.2f}s...")
+
             logger.info(
-                f"   🌐 GET Search (Recherche: {lbc_params.get('text')})...")
-
-            response = requests.get(
-                config.LBC_BASE_URL,
-                headers=headers,
-                params=lbc_params,
-                timeout=cfg.request_timeout_seconds
-            )
+                f"   🌐 GET Search (Recherche: {lbc_params.get('text')}, page {page})...")
+
+            response = LBCScraper._get_page(
+                config.LBC_BASE_URL, params, http_cache.KIND_SEARCH, pause)
+            if response is None:
+                return None
+            if response.from_cache:
+                logger.info("   🗄️ Page servie sans réseau (cache / replay).")
             if response.status_code == 403:
                 logger.exception("   🛑 ERREUR 403 : IP Bloquée (Datadome).")
                 return None
-            response.raise_for_status()
-            return response.text
+            if response.status_code != 200:
+                logger.error(
+                    f"   ❌ Erreur HTTP {response.status_code} sur la recherche.")
+                return None
+            return response.content
 
+        except CircuitOpenError as e:
+            logger.warning(f"   ⛔ {e}")
+            return None
         except Exception as e:
             logger.exception(f"   ❌ Erreur réseau : {e}")
             return None
 
     @staticmethod
-    def parse_data(html: str) -> list:
+    def _get_page(url: str, params: dict | None, kind: str,
+                  pause: Callable[[], Any]) -> http_cache.CachedResponse | None:
+        """
+        Point d'entrée réseau unique du scraper.
+        replay -> fixtures (aucun réseau, aucune pause) ;
+        sinon cache frais, ou pause de politesse + GET conditionnel.
+        En mode record, toute page obtenue est aussi écrite en fixture.
+        """
+        cfg = load_app_config().scraper
+        store = fixtures.get_store()
+
+        if cfg.mode == fixtures.MODE_REPLAY:
+            return store.replay(url, params, kind)
+
+        cache = http_cache.get_cache()
+        response = cache.get_fresh(url, params, kind)
+        if response is None:
+            pause()
+            response = cache.fetch(
+                url, params, kind, timeout=cfg.request_timeout_seconds)
+
+        if cfg.mode == fixtures.MODE_RECORD:
+            store.record(url, params, kind, response)
+        return response
+
+    @staticmethod
+    def parse_data(html: bytes | str | None) -> list:
         """Extrait la liste des annonces depuis la recherche."""
-        if not html:
-            return []
-        soup = BeautifulSoup(html, 'html.parser')
-        script = soup.find("script", id="__NEXT_DATA__")
-        if not script:
+        data = extract_next_data(html)
+        if not data:
             return []
         try:
-            return json.loads(script.string)["props"]["pageProps"]["searchData"]["ads"]
-        except:
+            return data["props"]["pageProps"]["searchData"]["ads"]
+        except (KeyError, TypeError):
             return []
 
     @staticmethod
-    def process_ads(ads_raw: list, whitelist: list, blacklist: list) -> list:
+    def process_ads(ads_raw: list, whitelist: list, blacklist: list, word_boundary: bool = False) -> list:
         """Filtre la liste brute et extrait les données structurées."""
         clean_ads = []
         rejected_count = 0  # Compteur
+        rejected_by: Counter = Counter()  # mot-clé (ou motif) -> nb de rejets
+
+        black_matcher = get_matcher(blacklist, word_boundary)
+        white_matcher = get_matcher(whitelist, word_boundary)
 
         for ad in ads_raw:
             if "list_id" not in ad:
@@ -68,13 +121,18 @@ class LBCScraper:
 
             title = ad.get("subject", "").lower()
 
-            # --- FILTRAGE ---
-            is_blacklisted = any(bad in title for bad in blacklist)
-            is_whitelisted = (not whitelist) or any(
-                good in title for good in whitelist)
+            # --- FILTRAGE (1 passe par liste) ---
+            bad_kw = black_matcher.find(title)
+            if bad_kw is not None:
+                rejected_count += 1
+                rejected_by[f"blacklist:{bad_kw}"] += 1
+                logger.debug(f"      ⛔ Rejet blacklist '{bad_kw}' : {title}")
+                continue
 
-            if is_blacklisted or not is_whitelisted:
+            if white_matcher and white_matcher.find(title) is None:
                 rejected_count += 1
+                rejected_by["hors whitelist"] += 1
+                logger.debug(f"      ⛔ Rejet (aucun mot whitelist) : {title}")
                 continue
 
             # --- 1. TRANSFORMATION DES ATTRIBUTS ---
@@ -114,6 +172,51 @@ class LBCScraper:
         kept = len(clean_ads)
         logger.info(
             f"   🧹 Filtre : {total} reçues -> {rejected_count} rejetées -> {kept} gardées.")
+        if rejected_by:
+            details = ", ".join(f"{kw} x{n}" for kw,
+                                n in rejected_by.most_common())
+            logger.info(f"      🚫 Motifs de rejet : {details}")
+
+        return clean_ads
+
+    @staticmethod
+    def scan_search(lbc_params: dict, whitelist: list, blacklist: list,
+                    known_ids_fn: Callable[[list], set], max_pages: int,
+                    word_boundary: bool = False) -> list | None:
+        """
+        Parcourt les pages de résultats (tri par date) jusqu'à tomber sur une page
+        sans annonce retenue ou dont toutes les annonces retenues sont déjà en base
+        (vérifié en batch via known_ids_fn), ou jusqu'à max_pages.
+        Retourne None si la page 1 est inexploitable (réseau / parsing).
+        """
+        clean_ads: list = []
+        seen_ids: set = set()
+
+        for page in range(1, max(1, int(max_pages)) + 1):
+            raw_data = LBCScraper.parse_data(
+                LBCScraper.fetch_html(lbc_params, page=page))
+            if not raw_data:
+                if page == 1:
+                    return None
+                break
+
+            page_ads = [ad for ad in LBCScraper.process_ads(raw_data, whitelist, blacklist, word_boundary)
+                        if ad["id"] not in seen_ids]
+            seen_ids.update(ad["id"] for ad in page_ads)
+            clean_ads.extend(page_ads)
+
+            # Page entièrement filtrée (whitelist / blacklist / doublons) = rien de nouveau :
+            # ses annonces ne sont jamais en base, on ne peut pas s'en servir pour s'arrêter
+            if not page_ads:
+                logger.info(
+                    f"   ⏹️ Page {page} sans annonce retenue -> arrêt du parcours.")
+                break
+
+            known = known_ids_fn([ad["id"] for ad in page_ads])
+            if len(known) >= len(page_ads):
+                logger.info(
+                    f"   ⏹️ Page {page} entièrement connue -> arrêt du parcours.")
+                break
 
         return clean_ads
 
@@ -121,28 +224,26 @@ class LBCScraper:
     def get_ad_description(ad_url: str) -> str | None:
         """Va sur la page de l'annonce et extrait la description complète."""
         try:
-            cfg = load_app_config().scraper
-            time.sleep(random.uniform(cfg.ad_page_min_sleep_seconds,
-                       cfg.ad_page_max_sleep_seconds))
-            headers = config.get_random_headers()
+            def pause():
+                scheduler = get_scheduler()
+                scheduler.check()
+                _ad_page_limiter().acquire(ad_url, scale=scheduler.delay_factor)
 
-            response = requests.get(
-                ad_url, headers=headers, timeout=cfg.request_timeout_seconds)
-            if response.status_code != 200:
+            response = LBCScraper._get_page(
+                ad_url, None, http_cache.KIND_AD, pause)
+            if response is None or response.status_code != 200:
                 return None
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Méthode 1 : Via JSON caché (souvent présent)
-            script = soup.find("script", id="__NEXT_DATA__")
-            if script:
+            # Méthode 1 : Via JSON caché (souvent présent), sans parser le HTML
+            data = extract_next_data(response.content)
+            if data:
                 try:
-                    data = json.loads(script.string)
                     return data["props"]["pageProps"]["ad"]["body"]
-                except:
+                except (KeyError, TypeError):
                     pass
 
-            # Méthode 2 : Via HTML direct
+            # Méthode 2 : Via HTML direct (fallback BeautifulSoup)
+            soup = BeautifulSoup(response.text, 'html.parser')
             desc_div = soup.find(
                 "div", {"data-qa-id": "adview_description_container"})
             if desc_div:
@@ -150,11 +251,39 @@ class LBCScraper:
 
             return None
 
+        except CircuitOpenError as e:
+            logger.warning(f"      ⛔ Description non lue : {e}")
+            return None
         except Exception as e:
             logger.exception(
                 f"      ⚠️ Impossible de lire la description : {e}")
             return None
 
+    @staticmethod
+    def fetch_descriptions(ad_urls: list) -> dict:
+        """
+        Deep scraping concurrent : récupère les descriptions de plusieurs annonces.
+        La concurrence (SCRAPER_AD_CONCURRENCY) recouvre la latence réseau,
+        le débit reste plafonné par le limiteur partagé (SCRAPER_AD_*_SLEEP).
+        Retourne {url: description | None}.
+        """
+        urls = list(dict.fromkeys(u for u in ad_urls if u))
+        if not urls:
+            return {}
+
+        cfg = load_app_config().scraper
+        workers = max(1, min(int(cfg.ad_page_concurrency), len(urls)))
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="adpage") as pool:
+            results = dict(
+                zip(urls, pool.map(LBCScraper.get_ad_description, urls)))
+
+        found = sum(1 for d in results.values() if d)
+        logger.info(
+            f"   📄 Deep scraping : {found}/{len(urls)} descriptions en {time.monotonic() - started:.1f}s ({workers} threads).")
+        return results
+
     @staticmethod
     def _safe_int(val):
         try:
@@ -97,7 +97,7 @@ class SearchManager:
         return lst_searches
 
     @staticmethod
-    def create_search(name: str, lbc_params: dict, whitelist: list = None, blacklist: list = None) -> str:
+    def create_search(name: str, lbc_params: dict, whitelist: list = None, blacklist: list = None, max_pages: int = None) -> str:
         # 1. SÉCURITÉ ANTI-DOUBLON
         # On regarde si une recherche porte déjà ce nom exact
         existing_searches = SearchManager.list_searches()
@@ -120,6 +120,9 @@ class SearchManager:
                 "blacklist": blacklist if blacklist else []
             }
         }
+        # Profondeur de pagination propre à la recherche (sinon SCRAPER_MAX_PAGES)
+        if max_pages:
+            search_data["max_pages"] = int(max_pages)
         SearchManager._save_file(search_data)
         logger.info(f"✅ Recherche '{name}' créée (ID: {search_id})")
         return search_id
@@ -0,0 +1,105 @@
+import logging
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+from .keyword_filter import get_matcher
+from .scoring_config import SCORING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def is_enabled() -> bool:
+    return bool(SCORING_CONFIG.get("triage", {}).get("enabled", False))
+
+
+def market_reference_price(search: dict) -> Optional[float]:
+    """
+    Prix de référence du marché de la recherche (médiane ou moyenne selon veto.price_floor_stat),
+    persisté dans model_meta par le dernier entraînement du PriceEngine (mêmes veto / outliers).
+    None tant qu'aucun modèle n'a été entraîné (dataset < training.min_samples).
+    """
+    value = (search.get("model_meta") or {}).get("market_price")
+    return float(value) if value else None
+
+
+def triage_reason(ad: dict, market_price: Optional[float], junk_matcher) -> Optional[str]:
+    """Première règle déclenchée pour l'annonce (None = annonce à analyser)."""
+    engine_cfg = SCORING_CONFIG["price_engine"]
+    limits = engine_cfg["outliers"]
+
+    title = (ad.get("title") or "").lower()
+    junk_kw = junk_matcher.find(title)
+    if junk_kw is not None:
+        return f"junk:{junk_kw}"
+
+    price = ad.get("price")
+    if price:
+        if price < limits["min_price"]:
+            return "outlier:min_price"
+        if price > limits["max_price"]:
+            return "outlier:max_price"
+
+        floor_ratio = float(engine_cfg.get("veto", {}).get("price_floor_ratio", 0.30))
+        if market_price and price < floor_ratio * market_price:
+            return "price_floor"
+
+    km = ad.get("km")
+    if km:
+        if km < limits["min_mileage"]:
+            return "outlier:min_mileage"
+        if km > limits["max_mileage"]:
+            return "outlier:max_mileage"
+
+    return None
+
+
+def rule_action(reason: str) -> str:
+    """Action configurée pour la famille de la règle ("outlier:min_price" -> actions["outlier"])."""
+    actions = SCORING_CONFIG.get("triage", {}).get("actions", {})
+    return actions.get(reason.split(":", 1)[0], "flag")
+
+
+def triage_ads(ads: List[dict], market_price: Optional[float],
+               already_triaged: Iterable[str] = ()) -> Tuple[List[dict], List[dict]]:
+    """
+    Triage pré-LLM des nouvelles annonces, avant deep scraping + Gemini.
+    Retourne (à analyser, écartées) selon l'action de la règle déclenchée (triage.actions) :
+      - "skip" : l'annonce n'est ni scrapée ni analysée ;
+      - "flag" : l'annonce est analysée normalement.
+    La règle est conservée sur l'annonce (scores.triage) ; les annonces déjà
+    marquées lors d'un passage précédent (already_triaged) ne sont pas recomptées.
+    Les compteurs par règle (= appels LLM évités) sont loggés.
+    """
+    if not ads or not is_enabled():
+        return ads, []
+
+    cfg = SCORING_CONFIG["triage"]
+    already_triaged = {str(ad_id) for ad_id in already_triaged}
+    junk_matcher = get_matcher(cfg.get("junk_keywords", []), word_boundary=True)
+    kept, skipped = [], []
+    skipped_by_rule: Counter = Counter()
+    flagged_by_rule: Counter = Counter()
+    repeated = 0
+    for ad in ads:
+        reason = triage_reason(ad, market_price, junk_matcher)
+        if reason is None:
+            kept.append(ad)
+            continue
+        ad["scores"] = {"triage": reason}
+        skip = rule_action(reason) == "skip"
+        (skipped if skip else kept).append(ad)
+        if str(ad.get("id")) in already_triaged:
+            repeated += 1
+        else:
+            (skipped_by_rule if skip else flagged_by_rule)[reason] += 1
+
+    for by_rule, label in ((skipped_by_rule, "appels LLM évités"),
+                           (flagged_by_rule, "annonces suspectes analysées")):
+        if by_rule:
+            details = ", ".join(f"{rule} x{n}" for rule, n in by_rule.most_common())
+            logger.info(
+                f"   🧮 Triage : {sum(by_rule.values())} {label} sur {len(ads)} : {details}")
+    if repeated:
+        logger.info(f"   🧮 Triage : {repeated} annonces déjà triées (non recomptées)")
+
+    return kept, skipped
@@ -0,0 +1,63 @@
+import re
+import unicodedata
+from typing import Dict, List
+
+import pandas as pd
+
+from .scoring_config import SCORING_CONFIG
+
+# Colonnes d'identité (texte normalisé) et leurs codes numériques pour le modèle global
+IDENTITY_COLUMNS = ["brand", "model", "generation"]
+IDENTITY_FEATURES = [f"{col}_code" for col in IDENTITY_COLUMNS]
+
+
+def normalize_label(value) -> str:
+    """'Mazda MX-5 NA' -> 'mazda mx 5 na' (minuscules, sans accents ni ponctuation)."""
+    if not isinstance(value, str):
+        return ""
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(c for c in value if not unicodedata.combining(c)).lower()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", value).split())
+
+
+def _generation(title: str, patterns: List[re.Pattern]) -> str:
+    for pattern in patterns:
+        match = pattern.search(title)
+        if match:
+            return match.group(1).replace(" ", "")
+    return ""
+
+
+def identity_frame(market: pd.DataFrame) -> pd.DataFrame:
+    """
+    Marque / modèle (attributs LBC de raw_data) et génération (motifs sur le titre),
+    normalisés, pour les lignes de market (colonnes title, brand, model).
+    """
+    cfg = SCORING_CONFIG["price_engine"].get("global_model", {})
+    patterns = [re.compile(p) for p in cfg.get("generation_patterns", [])]
+
+    titles = market["title"].map(normalize_label) if "title" in market.columns else pd.Series(
+        "", index=market.index)
+    out = pd.DataFrame(index=market.index)
+    for col in ("brand", "model"):
+        out[col] = market[col].map(normalize_label) if col in market.columns else ""
+    out["generation"] = titles.map(lambda t: _generation(t, patterns))
+    return out
+
+
+def build_vocabulary(identity: pd.DataFrame) -> Dict[str, Dict[str, int]]:
+    """Codes ordinaux stables (valeurs triées) par colonne d'identité ; '' = inconnu."""
+    return {
+        col: {value: code for code, value in enumerate(sorted(set(identity[col]) - {""}))}
+        for col in IDENTITY_COLUMNS
+    }
+
+
+def encode_identity(market: pd.DataFrame, vocabulary: Dict[str, Dict[str, int]]) -> pd.DataFrame:
+    """Copie de market + colonnes *_code (valeur hors vocabulaire => -1)."""
+    identity = identity_frame(market)
+    encoded = market.copy()
+    for col, feature in zip(IDENTITY_COLUMNS, IDENTITY_FEATURES):
+        encoded[feature] = identity[col].map(
+            vocabulary.get(col, {})).fillna(-1).astype(float)
+    return encoded
@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
 import os
+from datetime import datetime
 import plotly.express as px
 from frontend.layout import render_header
-from frontend.data_loader import load_home_data, load_logs
+from frontend.data_loader import load_home_data, load_logs, load_scraper_state
 
 # 0. CONFIG & HEADER
 st.set_page_config(page_title="LBC Hunter - Home",
@@ -15,6 +16,16 @@ status_counts, df_ads, df_searches = load_home_data()
 
 st.title("🦅 Dashboard")
 
+# État du scraping (disjoncteur 403/429/5xx)
+scraper_state = load_scraper_state()
+if scraper_state.get("state") == "OPEN":
+    until = datetime.fromtimestamp(float(scraper_state.get("open_until") or 0))
+    st.error(
+        f"⛔ Scraping suspendu ({scraper_state.get('reason')}) jusqu'à {until:%H:%M}.")
+elif scraper_state:
+    st.caption(
+        f"🌐 Scraping OK — facteur de pause x{scraper_state.get('delay_factor', 1.0)}")
+
 
 def request_nav(page_path: str, **state_updates):
     """Demande une navigation. À exécuter dans le flux principal, pas dans un callback."""
@@ -6,6 +6,7 @@ from core.models import Ad
 from core.search_manager import SearchManager
 from core.scoring_config import SCORING_CONFIG
 from core.app_config import load_app_config
+from core.request_scheduler import read_state
 import logging
 
 logger = logging.getLogger(__name__)
@@ -264,6 +265,29 @@ def load_ads_selector(limit: int = 200):
     return db.list_ads_for_selector(limit=limit)
 
 
+@st.cache_resource(ttl=load_app_config().streamlit.cache_ttl_seconds)
+def load_price_engine(search_id: str):
+    """Modèle prix persisté d'une recherche (forêt compacte), sans DB ni ré-entraînement."""
+    from core.price_engine import PriceEngine
+
+    engine = PriceEngine(db_client=None)
+    return engine if engine.load_model(search_id) else None
+
+
+@st.cache_data(ttl=load_app_config().streamlit.cache_ttl_seconds)
+def load_price_grid(search_id: str):
+    """Surface de prix précalculée d'une recherche (None si aucun modèle persisté)."""
+    from core.model_store import ModelStore
+
+    bundle = ModelStore().load(search_id)
+    return bundle.get("grid") if bundle else None
+
+
+def load_scraper_state() -> dict:
+    """État du scheduler de scraping (disjoncteur / cadence), écrit par le worker."""
+    return read_state(load_app_config().paths.scraper_state_file)
+
+
 def load_logs(lines=200):
     log_file = "logs/worker.log"
     if os.path.exists(log_file):
@@ -3,8 +3,10 @@ from core.scraper import LBCScraper
 from core.db_client import DatabaseClient
 from core.ai_analyst import AIAnalyst, AIConfigError
 from core.price_engine import PriceEngine
+from core import fixtures, http_cache, triage
+from core.request_scheduler import get_scheduler
 from datetime import datetime
-import time
+import argparse
 import sys
 import os
 import logging
@@ -25,13 +27,21 @@ def initialize_default_search():
         logger.info(f"🔍 {searche['id']}-{searche['name']}")
 
 
-def run_bot():
+def run_bot(no_llm: bool = False):
+    """
+    no_llm : aucun appel Gemini (ni clé API requise) ; les nouvelles annonces sont
+    sauvegardées sans analyse IA et seront analysées au prochain passage normal.
+    Forcé en mode replay : le rejeu ne couvre que scraper + DB + PriceEngine.
+    """
     logger.info("🚀 --- LBC HUNTER ---")
     cfg = load_app_config()
+    if cfg.scraper.mode == fixtures.MODE_REPLAY and not no_llm:
+        logger.info("📼 Mode replay : analyse IA désactivée (pas de réseau).")
+        no_llm = True
 
     try:
         db = DatabaseClient()
-        analyst = AIAnalyst()
+        analyst = None if no_llm else AIAnalyst(analysis_cache=db)
         price_engine = PriceEngine(db)
     except AIConfigError as e:
         logger.error("🛑 IA non utilisable: %s", e)
@@ -44,19 +54,29 @@ def run_bot():
     initialize_default_search()
     tasks = SearchManager.list_searches(only_active=True)
 
+    scheduler = get_scheduler()
+
     for task in tasks:
         logger.info(f"\n🔎 Traitement : {task['name']}")
 
-        # 1. SCRAPE LISTE
-        html = LBCScraper.fetch_html(task['lbc_params'])
-        raw_data = LBCScraper.parse_data(html)
-        if not raw_data:
+        if scheduler.is_open():
+            logger.warning(
+                "⛔ Disjoncteur ouvert (%s) : scraping des recherches restantes suspendu.",
+                scheduler.reason)
+            break
+
+        # 1+2. SCRAPE LISTE (multi-pages, arrêt sur page déjà connue) + FILTER & TRANSFORM
+        clean_ads = LBCScraper.scan_search(
+            task['lbc_params'],
+            task['filters']['whitelist'],
+            task['filters']['blacklist'],
+            known_ids_fn=db.get_existing_ad_ids,
+            max_pages=task.get('max_pages') or cfg.scraper.max_pages_per_search,
+            word_boundary=task['filters'].get('word_boundary', False),
+        )
+        if clean_ads is None:
             continue
 
-        # 2. FILTER & TRANSFORM
-        clean_ads = LBCScraper.process_ads(
-            raw_data, task['filters']['whitelist'], task['filters']['blacklist'])
-
         # 3. ENRICHISSEMENT INTELLIGENT
         ads_to_save = []
 
@@ -64,32 +84,52 @@ def run_bot():
             logger.info(
                 f"   🎯 {len(clean_ads)} annonces détectées. Vérification du cache...")
 
-            for ad in clean_ads:
-                # Cache Check
-                already_analyzed = db.is_ad_analyzed(ad['id'])
-
-                if already_analyzed:
-                    logger.info(
-                        f"      👻 Connue (Skip IA) : {ad['title'][:20]}...")
-                    ads_to_save.append(ad)
-                    continue
-
-                # Deep Scraping
-                full_desc = LBCScraper.get_ad_description(ad['url'])
+            # Cache Check (1 seule requête pour toute la page)
+            analyzed_ids = db.get_analyzed_ad_ids(
+                [ad['id'] for ad in clean_ads])
+            known_ads = [ad for ad in clean_ads if ad['id'] in analyzed_ids]
+            new_ads = [ad for ad in clean_ads if ad['id'] not in analyzed_ids]
+            logger.info(
+                f"   👻 {len(known_ads)} connues (Skip IA) | 🆕 {len(new_ads)} nouvelles.")
+            ads_to_save.extend(known_ads)
+
+            # Triage pré-LLM (veto / outliers du PriceEngine + prix de marché de la recherche) :
+            # la règle est sauvegardée dans scores.triage ; les règles en "skip" écartent
+            # l'annonce du deep scraping et de l'IA
+            if new_ads and triage.is_enabled():
+                new_ads, skipped_ads = triage.triage_ads(
+                    new_ads, triage.market_reference_price(task),
+                    already_triaged=db.get_triaged_ad_ids([ad['id'] for ad in new_ads]))
+                ads_to_save.extend(skipped_ads)
+
+            # Deep Scraping (concurrent, débit borné par le limiteur partagé)
+            descriptions = LBCScraper.fetch_descriptions(
+                [ad['url'] for ad in new_ads])
+
+            for ad in new_ads:
+                full_desc = descriptions.get(ad['url'])
                 if full_desc:
                     ad['description'] = full_desc
                 else:
                     logger.info(
                         f"      ⚠️ Pas de description pour {ad['title']}")
 
-                # Analyse Gemini
+            # Analyse Gemini (concurrente, débit borné par les quotas RPM/TPM)
+            if new_ads and analyst is None:
+                logger.info(
+                    f"      🚫 {len(new_ads)} NOUVELLES sauvegardées sans analyse IA (--no-llm).")
+            elif new_ads:
                 logger.info(
-                    f"      🧠 NOUVEAU -> Analyse IA : {ad['title'][:20]}...")
-                ai_result = analyst.analyze_ad(ad)
-                time.sleep(cfg.worker.gemini_sleep_seconds)
+                    f"      🧠 {len(new_ads)} NOUVELLES -> Analyse IA...")
+            ai_results = analyst.analyze_ads(new_ads) if analyst else {}
 
+            for ad in new_ads:
+                ai_result = ai_results.get(ad['id'])
                 if ai_result:
+                    triage_rule = (ad.get('scores') or {}).get('triage')
                     ad.update(ai_result)
+                    if triage_rule:
+                        ad['scores']['triage'] = triage_rule
                     if ai_result["scores"]["sanity_checks"]["k_arnaque"] < 0.3:
                         logger.info("         💀 SCAM DÉTECTÉ !")
 
@@ -100,18 +140,34 @@ def run_bot():
             db.upsert_ads(ads_to_save, search_id=task['id'])
             SearchManager.update_last_run(task['id'])
 
-        # 5. MARKET ANALYSIS (Le Sprint 4 !)
-        # Une fois qu'on a toutes les données à jour, on lance les maths
-        logger.info(f"   📐 Calcul de la cote marché (Random Forest)...")
-        price_engine.update_deal_scores(task['id'])
+    # 5. MARKET ANALYSIS (Le Sprint 4 !)
+    # Une fois TOUTES les recherches scrapées et sauvegardées, on lance les maths en parallèle
+    logger.info("\n📐 Calcul de la cote marché (Random Forest)...")
+    price_engine.update_all_deal_scores(
+        [task['id'] for task in tasks], processes=cfg.worker.market_processes)
 
     # 6. NETTOYAGE (Une fois que toutes les recherches sont finies)
     # On vérifie les annonces qu'on n'a pas vues depuis 3 jours (par exemple)
-    logger.info("\n🧹 Vérification des annonces disparues...")
-    db.archive_old_ads(days_threshold=cfg.worker.archive_days_threshold)
+    if cfg.scraper.mode == fixtures.MODE_REPLAY:
+        logger.info("\n📼 Mode replay : vérification des annonces disparues ignorée (pas de réseau).")
+    else:
+        logger.info("\n🧹 Vérification des annonces disparues...")
+        db.archive_old_ads(days_threshold=cfg.worker.archive_days_threshold)
+
+    pruned = http_cache.get_cache().prune()
+    if pruned:
+        logger.info(f"🗄️ Cache HTTP : {pruned} entrées expirées supprimées.")
+
+    if cfg.worker.ai_cache_max_age_days > 0:
+        pruned = db.prune_cached_analyses(cfg.worker.ai_cache_max_age_days)
+        if pruned:
+            logger.info(f"🗄️ Cache IA : {pruned} analyses inutilisées supprimées.")
 
     logger.info("\n✅ Job terminé.")
 
 
 if __name__ == "__main__":
-    run_bot()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--no-llm", action="store_true",
+                        help="scraping + DB + cote marché, sans appel Gemini (implicite en replay)")
+    run_bot(no_llm=parser.parse_args().no_llm)
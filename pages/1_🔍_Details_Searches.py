@@ -3,7 +3,7 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from frontend.layout import render_header
-from frontend.data_loader import load_search_details_data
+from frontend.data_loader import load_search_details_data, load_price_grid
 from core.search_manager import SearchManager
 
 # 0. CONFIG & HEADER
@@ -28,13 +28,19 @@ def consume_nav():
         st.switch_page(target)
 
 
+FAIR_PRICE_CURVE = "fair_price_curve"
+
+
 def handle_ad_click_details(df_key: str, selection: dict | None):
     """Prépare la navigation vers Details Ads (sans switch_page dans le callback)."""
     selected_ad_id = None
 
     # 1) Clic Plotly
-    if selection and selection.get("points"):
-        point_index = selection["points"][0]["pointIndex"]
+    # (les points de la courbe prix juste ne sont pas des annonces)
+    points = [p for p in (selection or {}).get("points", [])
+              if p.get("customdata") != FAIR_PRICE_CURVE]
+    if points:
+        point_index = points[0]["pointIndex"]
         selected_ad_id = st.session_state[df_key].iloc[point_index]["ID"]
 
     # 2) Clic Table
@@ -217,6 +223,28 @@ if not subset_active.empty:
         hovertemplate='%{text}<extra></extra>'
     ))
 
+# Courbe "prix juste" (surface précalculée par le Price Engine, sans relancer le modèle)
+price_grid = load_price_grid(selected_id)
+if price_grid is not None:
+    grid_years = [int(y) for y in price_grid.years]
+    ref_years = subset_active["Année"] if not subset_active.empty else df_ads["Année"]
+    ref_year = int(ref_years.dropna().median()) if ref_years.notna().any() else grid_years[len(grid_years) // 2]
+    ref_year = min(max(ref_year, grid_years[0]), grid_years[-1])
+    if len(grid_years) > 1:
+        ref_year = st.select_slider(
+            "Année de référence (courbe prix juste)", options=grid_years, value=ref_year)
+
+    curve_km, curve_price = price_grid.curve(ref_year)
+    fig_scatter.add_trace(go.Scatter(
+        x=curve_km,
+        y=curve_price,
+        mode='lines',
+        name=f"Prix juste ({ref_year})",
+        line=dict(color='royalblue', width=2, dash='dash'),
+        customdata=[FAIR_PRICE_CURVE] * len(curve_km),
+        hovertemplate='%{x:,.0f} km → %{y:,.0f} €<extra></extra>'
+    ))
+
 fig_scatter.update_layout(
     xaxis_title="Kilométrage (km)",
     yaxis_title="Prix (€)",
@@ -15,7 +15,7 @@ def main():
     from datetime import datetime
 
     from frontend.layout import render_header
-    from frontend.data_loader import load_ad_details_data, load_ads_selector
+    from frontend.data_loader import load_ad_details_data, load_ads_selector, load_price_engine
     from core.db_client import DatabaseClient
 
     # Service re-scan (alive + IA + scoring)
@@ -327,6 +327,14 @@ def main():
     repair = financial.get("repair_cost", 0)
     market = financial.get("market_estimation", None)
 
+    # Pas encore de cote stockée : estimation à la volée via la surface de prix persistée
+    if market is None and ad.get("found_by_searches") and ad.get("year") and ad.get("mileage"):
+        engine = load_price_engine(ad["found_by_searches"][0])
+        if engine is not None:
+            estimate = engine.fair_price(
+                ad["year"], ad["mileage"], ad.get("horsepower"))
+            market = int(round(estimate)) if estimate else None
+
     col_e1, col_e2, col_e3, col_e4 = st.columns(4)
     col_e1.metric("Prix annonce", f"{posted} €" if posted is not None else "—")
     col_e2.metric("Coût réparations",
@@ -0,0 +1,101 @@
+"""
+Benchmark : forêt compacte (tableaux plats + NumPy) vs RandomForestRegressor.predict.
+
+Vérifie l'égalité exacte des prédictions, puis compare latence 1 ligne, latence batch
+et taille disque (joblib compress=3, comme ModelStore).
+
+Usage :
+    python tools/bench_compact_forest.py                  # dataset synthétique
+    python tools/bench_compact_forest.py --search <id>    # dataset réel d'une recherche (DB)
+"""
+from _bootstrap import PROJECT_ROOT  # noqa: F401
+
+import argparse
+import io
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from core.compact_forest import CompactForest
+from core.model_store import ModelStore
+from core.price_engine import PriceEngine
+
+
+def build_synthetic_frame(n: int = 800, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    year = rng.integers(1990, 2024, n)
+    mileage = rng.integers(5_000, 300_000, n)
+    horsepower = rng.choice([90, 115, 131, 160, np.nan], n)
+    price = 2_000 + (year - 1990) * 350 - mileage * 0.02 + \
+        np.nan_to_num(horsepower, nan=110) * 20 + rng.normal(0, 800, n)
+    return pd.DataFrame({"price": price.round(), "year": year,
+                         "mileage": mileage, "horsepower": horsepower})
+
+
+def dumped_size(obj) -> int:
+    buf = io.BytesIO()
+    joblib.dump(obj, buf, compress=3)
+    return buf.tell()
+
+
+def bench(fn, n: int) -> float:
+    started = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - started) / n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--search", help="search_id (dataset réel via la DB)")
+    parser.add_argument("-n", type=int, default=500, help="itérations 1 ligne")
+    args = parser.parse_args()
+
+    # ModelStore jetable : toujours un vrai fit, le modèle sklearn reste en mémoire
+    store = ModelStore(tempfile.mkdtemp(prefix="bench_models_"))
+    if args.search:
+        from core.db_client import DatabaseClient
+        engine = PriceEngine(DatabaseClient(), model_store=store)
+        df = engine.get_data_for_search(args.search)
+    else:
+        engine = PriceEngine(db_client=None, model_store=store)
+        df = build_synthetic_frame()
+
+    engine.train(args.search or "bench", df)
+    if not engine.is_trained:
+        print("❌ Modèle non entraîné (dataset trop petit ?)")
+        return
+
+    forest = engine.model
+    X = engine._feature_matrix(df)
+    compact = CompactForest.from_sklearn(forest)
+    print(f"🌲 {len(forest.estimators_)} arbres | {len(compact.value)} noeuds | "
+          f"profondeur max {compact.max_depth} | {len(X)} lignes")
+
+    if not compact.matches(forest, X):
+        print("❌ Prédictions différentes de sklearn !")
+        return
+    print("✅ Prédictions identiques à sklearn (bit à bit)")
+
+    row_df = X.iloc[[0]]
+    row = X.iloc[0].to_numpy(dtype=float)
+    X_np = X.to_numpy(dtype=float)
+
+    t_sk_one = bench(lambda: forest.predict(row_df), args.n)
+    t_cf_one = bench(lambda: compact.predict_one(row), args.n)
+    t_sk_all = bench(lambda: forest.predict(X), 10)
+    t_cf_all = bench(lambda: compact.predict(X_np), 10)
+    print(f"- 1 ligne  sklearn : {t_sk_one * 1e6:9.1f} µs | compact : {t_cf_one * 1e6:9.1f} µs "
+          f"(x{t_sk_one / t_cf_one:.0f})")
+    print(f"- {len(X)} lignes sklearn : {t_sk_all * 1e3:7.2f} ms | compact : {t_cf_all * 1e3:7.2f} ms")
+
+    size_sk, size_cf = dumped_size(forest), dumped_size(compact)
+    print(f"- Disque   sklearn : {size_sk / 1024:9.0f} KB | compact : {size_cf / 1024:9.0f} KB "
+          f"(x{size_sk / size_cf:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark : extraction __NEXT_DATA__ (slicing bytes + JSON rapide) vs BeautifulSoup.
+
+Usage :
+    python tools/bench_next_data.py                 # page synthétique
+    python tools/bench_next_data.py page.html -n 50 # page réelle sauvegardée
+"""
+from _bootstrap import PROJECT_ROOT  # noqa: F401
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from core.next_data import extract_next_data
+
+
+def extract_with_bs4(body: bytes) -> dict | None:
+    """Ancienne méthode (référence)."""
+    soup = BeautifulSoup(body.decode("utf-8", errors="replace"), "html.parser")
+    script = soup.find("script", id="__NEXT_DATA__")
+    if not script:
+        return None
+    return json.loads(script.string)
+
+
+def build_synthetic_page(n_ads: int = 35) -> bytes:
+    """Page proche d'une recherche LBC : beaucoup de HTML + un gros JSON."""
+    ads = [
+        {
+            "list_id": 2_000_000_000 + i,
+            "subject": f"Mazda MX-5 NA 1.6 115ch #{i}",
+            "url": f"https://www.leboncoin.fr/ad/voitures/{2_000_000_000 + i}",
+            "price": [4500 + i * 10],
+            "first_publication_date": "2024-05-01 12:00:00",
+            "location": {"city": "Lyon", "zipcode": "69001"},
+            "images": {"small_url": "https://img.leboncoin.fr/x.jpg"},
+            "attributes": [
+                {"key": k, "value": str(v), "value_label": str(v)}
+                for k, v in [("mileage", 150000), ("regdate", 1994), ("fuel", 1),
+                             ("gearbox", 1), ("horse_power_din", 115)] * 6
+            ],
+            "body": "Très belle MX-5, carnet d'entretien, factures. " * 20,
+        }
+        for i in range(n_ads)
+    ]
+    payload = json.dumps({"props": {"pageProps": {"searchData": {"ads": ads}}}})
+    filler = "".join(
+        f'<div class="c{i}"><a href="/x/{i}"><span>item {i}</span></a></div>'
+        for i in range(4000)
+    )
+    html = (
+        "<!DOCTYPE html><html><head><title>LBC</title></head><body>"
+        f"{filler}"
+        f'<script id="__NEXT_DATA__" type="application/json">{payload}</script>'
+        "</body></html>"
+    )
+    return html.encode("utf-8")
+
+
+def bench(fn, body: bytes, n: int) -> float:
+    started = time.perf_counter()
+    for _ in range(n):
+        fn(body)
+    return (time.perf_counter() - started) / n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("html_file", nargs="?", help="page HTML sauvegardée")
+    parser.add_argument("-n", type=int, default=20, help="itérations")
+    args = parser.parse_args()
+
+    body = Path(args.html_file).read_bytes(
+    ) if args.html_file else build_synthetic_page()
+    print(f"📄 Page : {len(body) / 1024:.0f} KB | {args.n} itérations")
+
+    fast, ref = extract_next_data(body), extract_with_bs4(body)
+    if fast != ref:
+        print("❌ Les deux extracteurs ne renvoient pas le même JSON !")
+        return
+    print("✅ Résultats identiques")
+
+    t_bs4 = bench(extract_with_bs4, body, args.n)
+    t_fast = bench(extract_next_data, body, args.n)
+    print(f"- BeautifulSoup : {t_bs4 * 1000:8.2f} ms/page")
+    print(f"- Slicing bytes : {t_fast * 1000:8.2f} ms/page")
+    print(f"⚡ Speedup x{t_bs4 / t_fast:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Bench hors ligne du pipeline scraper à partir des fixtures enregistrées.
+
+1) Enregistrer une fois :   SCRAPER_MODE=record python main.py
+2) Rejouer le worker :      SCRAPER_MODE=replay python main.py   (DB + PriceEngine, sans réseau)
+   Le rejeu ne couvre pas l'IA : --no-llm est implicite (ni clé GEMINI_API_KEY ni appel
+   Gemini), les nouvelles annonces sont sauvegardées sans analyse.
+3) Mesurer le parsing :     python tools/bench_replay.py [-n 5]
+"""
+from _bootstrap import PROJECT_ROOT  # noqa: F401
+
+import argparse
+import time
+
+from core import fixtures, http_cache
+from core.next_data import extract_next_data
+from core.scraper import LBCScraper
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=5, help="itérations")
+    args = parser.parse_args()
+
+    store = fixtures.get_store()
+    search_pages = list(store.iter_bodies(http_cache.KIND_SEARCH))
+    ad_pages = list(store.iter_bodies(http_cache.KIND_AD))
+    print(f"📼 Fixtures : {len(search_pages)} recherches | {len(ad_pages)} annonces ({store.dir})")
+    if not search_pages and not ad_pages:
+        print("❌ Aucune fixture. Lancer d'abord : SCRAPER_MODE=record python main.py")
+        return
+
+    n_ads = 0
+    started = time.perf_counter()
+    for _ in range(args.n):
+        for body in search_pages:
+            n_ads += len(LBCScraper.process_ads(LBCScraper.parse_data(body), [], []))
+    elapsed = time.perf_counter() - started
+    if search_pages:
+        print(f"- parse_data + process_ads : {elapsed / (args.n * len(search_pages)) * 1000:.2f} ms/page "
+              f"| {n_ads / elapsed:,.0f} annonces/s")
+
+    started = time.perf_counter()
+    for _ in range(args.n):
+        for body in ad_pages:
+            extract_next_data(body)
+    elapsed = time.perf_counter() - started
+    if ad_pages:
+        print(f"- extraction page annonce  : {elapsed / (args.n * len(ad_pages)) * 1000:.2f} ms/page")
+
+
+if __name__ == "__main__":
+    main()
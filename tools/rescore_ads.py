@@ -0,0 +1,97 @@
+"""
+Re-scoring hors ligne : rejoue AIAnalyst._calculate_score sur les ai_analysis déjà en base
+(après une modification de SCORING_CONFIG : poids, bonus/malus, sévérités...).
+
+- aucun appel LLM, aucun appel HTTP ;
+- lecture streamée par paquets, écriture batch (bulk_update_scores, patchs fusionnés :
+  la cote marché financial.market_estimation est conservée) ; seules les annonces
+  dont les scores changent réellement sont réécrites ;
+- le deal score déjà calculé par le PriceEngine est réutilisé pour le total.
+
+Usage :
+    python tools/rescore_ads.py                 # rescoring + écriture
+    python tools/rescore_ads.py --dry-run       # calcule et compte les totaux modifiés, sans écrire
+    python tools/rescore_ads.py --market        # + recalcul des cotes marché des recherches actives
+"""
+from _bootstrap import PROJECT_ROOT  # noqa: F401
+
+import argparse
+import json
+import logging
+import time
+
+from core.ai_analyst import AIAnalyst
+from core.db_client import DatabaseClient
+from core.logging_config import setup_logging
+
+logger = logging.getLogger("rescore_ads")
+
+
+def rescore_row(row: dict) -> dict:
+    cur_deal = row.get("cur_deal")
+    s_deal = cur_deal if cur_deal is not None and cur_deal == cur_deal else None
+    result = AIAnalyst._calculate_score(
+        {"ai_analysis": row["ai_analysis"]}, row, s_deal=s_deal)
+    return result["scores"]
+
+
+def is_unchanged(patch, stored) -> bool:
+    """True si chaque feuille du patch est déjà stockée à l'identique (fusion sans effet)."""
+    if isinstance(patch, dict):
+        return isinstance(stored, dict) and all(
+            key in stored and is_unchanged(value, stored[key]) for key, value in patch.items())
+    return patch == stored
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-size", type=int, default=5000,
+                        help="annonces lues par paquet")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="ne rien écrire")
+    parser.add_argument("--market", action="store_true",
+                        help="relancer ensuite la cote marché (PriceEngine)")
+    args = parser.parse_args()
+
+    setup_logging()
+    db = DatabaseClient()
+
+    started = time.perf_counter()
+    seen = changed = written = failed = 0
+    for chunk in db.iter_ads_for_rescoring(chunk_size=args.chunk_size):
+        updates = []
+        for row in chunk:
+            seen += 1
+            try:
+                scores = rescore_row(row)
+            except Exception as e:
+                failed += 1
+                logger.warning("Rescoring impossible (ad_id=%s): %s", row.get("id"), e)
+                continue
+            # Comparaison au format JSON stocké (tuples -> listes, clés str)
+            if is_unchanged(json.loads(json.dumps(scores)), row.get("cur_scores")):
+                continue
+            changed += 1
+            updates.append({"id": row["id"], "scores": scores})
+
+        if not args.dry_run:
+            written += db.bulk_update_scores(updates)
+        logger.info("… %s annonces traitées", seen)
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "✅ Rescoring %s: %s annonces, %s scores modifiés, %s écrites, %s erreurs (%.1fs)",
+        "(dry-run) " if args.dry_run else "", seen, changed, written, failed, elapsed)
+
+    if args.market and not args.dry_run:
+        from core.app_config import load_app_config
+        from core.price_engine import PriceEngine
+        from core.search_manager import SearchManager
+
+        search_ids = [s["id"] for s in SearchManager.list_searches(only_active=True)]
+        PriceEngine(db).update_all_deal_scores(
+            search_ids, processes=load_app_config().worker.market_processes)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 from _bootstrap import PROJECT_ROOT  # noqa: F401
 
+import sys
+
 from core.scoring_config import SCORING_CONFIG
 from core.app_config import load_app_config
 
@@ -70,8 +72,17 @@ def check_app_config():
     if cfg.streamlit.cache_ttl_seconds <= 0:
         fail("STREAMLIT_CACHE_TTL invalide")
 
-    if cfg.worker.gemini_sleep_seconds <= 0:
-        fail("WORKER_GEMINI_SLEEP invalide")
+    if cfg.gemini.concurrency <= 0:
+        fail("GEMINI_CONCURRENCY invalide")
+
+    if cfg.gemini.batch_size <= 0:
+        fail("GEMINI_BATCH_SIZE invalide")
+
+    if cfg.gemini.batch_max_input_tokens <= 0:
+        fail("GEMINI_BATCH_MAX_INPUT_TOKENS invalide")
+
+    if cfg.gemini.max_retries < 0 or cfg.gemini.backoff_base_seconds <= 0:
+        fail("GEMINI_MAX_RETRIES / GEMINI_BACKOFF_BASE invalides")
 
     if cfg.worker.archive_days_threshold < 0:
         fail("WORKER_ARCHIVE_DAYS invalide")
@@ -79,6 +90,29 @@ def check_app_config():
     ok("AppConfig runtime OK")
 
 
+def check_training_bounds():
+    """Dataset borné <= training.max_samples, même avec beaucoup de petites tranches d'années."""
+    import numpy as np
+    import pandas as pd
+    from core.price_engine import PriceEngine
+
+    max_samples = int(SCORING_CONFIG["price_engine"].get("training", {}).get("max_samples", 0) or 0)
+    if max_samples <= 0:
+        ok("training.max_samples désactivé")
+        return
+
+    rng = np.random.default_rng(0)
+    n = max_samples * 3
+    # 1 grosse tranche + une longue traîne de tranches à 1-2 annonces (arrondis défavorables)
+    years = np.concatenate([np.full(n - 200, 2015), rng.integers(1900, 2000, 200)])
+    df = pd.DataFrame({"year": years, "price": rng.integers(1_000, 30_000, n)})
+    bounded = PriceEngine.bound_training_frame(df)
+    if len(bounded) > max_samples:
+        fail(f"bound_training_frame dépasse max_samples ({len(bounded)} > {max_samples})")
+
+    ok(f"training.max_samples respecté ({len(df)} -> {len(bounded)})")
+
+
 def main():
     print("🔍 Vérification contrat white paper...\n")
 
@@ -86,6 +120,7 @@ def main():
     check_price_engine()
     check_severity()
     check_app_config()
+    check_training_bounds()
 
     print("\n🎉 CONTRAT OK — aligné white paper")
 